@@ -0,0 +1,114 @@
+"""
+Time the search that Sniper and Fstmt do in process against ag
+over the same folder.
+
+Usage:
+
+    python benchmarks/bench_grep.py [--dir path] [--patterns 'def \\w+' ...]
+        [--workers 1 4 ...] [--index] [--output results.json]
+
+The folder is the python standard library by default. Each pattern is
+searched once before the runs so the files are in the page cache, the
+time is the best of --repeat runs, ag is left out when it isn't found.
+With --index the searches that use the trigram index are timed too,
+the index is built by the first search.
+
+The results are printed as a table and written as json to the
+file given with --output.
+"""
+
+from subprocess import Popen, PIPE, DEVNULL
+from time import perf_counter
+from shutil import which
+import argparse
+import tempfile
+import platform
+import json
+import sys
+import os
+
+# The vyapp of the repository is used when it isn't installed.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vyapp.grep import scan, walk, REGEX
+from vyapp import grep
+
+def size(dir):
+    files = list(walk([dir]))
+    return len(files), sum(os.path.getsize(ind) for ind in files)
+
+def run_scan(dir, pattern, workers, index=None):
+    grep.INDEX = index
+    try:
+        return sum(len(ind) for ind in scan([dir], pattern, workers=workers))
+    finally:
+        grep.INDEX = None
+
+def run_ag(dir, pattern, path):
+    child = Popen([path, '--nocolor', '--nogroup', '--vimgrep',
+        pattern, dir], stdout=PIPE, stderr=DEVNULL, encoding='utf-8',
+            errors='replace')
+
+    with child.stdout:
+        count = sum(1 for ind in child.stdout if REGEX.match(ind))
+    child.wait()
+    return count
+
+def best(repeat, func, *args):
+    func(*args)
+    times = []
+    for ind in range(repeat):
+        start = perf_counter()
+        hits  = func(*args)
+        times.append(perf_counter() - start)
+    return min(times), hits
+
+def main():
+    parser = argparse.ArgumentParser(description='Grep benchmarks.')
+    parser.add_argument('--dir', default=os.path.dirname(os.__file__))
+    parser.add_argument('--patterns', nargs='+',
+        default=['import \\w+', 'def [a-z_]+\\(self', 'TODO'])
+    parser.add_argument('--workers', nargs='+', type=int,
+        default=sorted({1, os.cpu_count() or 1}))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--ag', default=which('ag'))
+    parser.add_argument('--index', action='store_true', help='Time the '
+        'search with the trigram index too, it is built in a temporary '
+        'folder before the runs.')
+    parser.add_argument('--output', help='File where the results are '
+        'written as json.')
+    args = parser.parse_args()
+
+    files, bytes = size(args.dir)
+    print('%s: %s files, %.1f MiB' % (args.dir, files, bytes / 2 ** 20))
+    cases = [('scan:%s' % ind, run_scan, (ind,)) for ind in args.workers]
+    if args.index:
+        cases.extend(('index:%s' % ind, run_scan, (ind, tempfile.mkdtemp()))
+            for ind in args.workers)
+    if args.ag:
+        cases.append(('ag', run_ag, (args.ag,)))
+    else:
+        print('ag was not found, it is left out.')
+
+    print('%-24s %-10s %9s %8s %10s' % ('pattern', 'engine',
+        'seconds', 'hits', 'MiB/s'))
+
+    results = []
+    for pattern in args.patterns:
+        for name, func, extra in cases:
+            seconds, hits = best(args.repeat, func, args.dir,
+                pattern, *extra)
+            print('%-24s %-10s %9.4f %8d %10.1f' % (pattern, name,
+                seconds, hits, bytes / 2 ** 20 / seconds))
+            results.append({'pattern': pattern, 'engine': name,
+                'seconds': seconds, 'hits': hits,
+                    'bytes_per_s': bytes / seconds})
+
+    if args.output:
+        with open(args.output, 'w') as fd:
+            json.dump({'python': platform.python_version(),
+                'cpus': os.cpu_count(), 'dir': args.dir, 'files': files,
+                    'bytes': bytes, 'results': results}, fd, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+"""
+Time the syntax highlighting of generated files in a few languages
+and sizes: Spider.update_all, Spider.update after small edits and
+get_tokens_unprocessed_matrix alone.
+
+Usage:
+
+    python benchmarks/bench_spider.py [--languages python c ...]
+        [--sizes 1000 10000 ...] [--edits 20] [--output results.json]
+
+It needs a display, when DISPLAY isn't set an Xvfb server is started
+for the run. Each result has the time, tokens/s, the number of calls
+to the Text widget command and the peak of python memory that
+was measured with tracemalloc in a second run.
+
+The results are printed as a table and written as json to the
+file given with --output.
+"""
+
+from subprocess import Popen, PIPE
+from random import Random
+from time import perf_counter, sleep
+import argparse
+import tempfile
+import tracemalloc
+import platform
+import json
+import sys
+import os
+
+# The vyapp of the repository is used when it isn't installed.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import generate, LANGUAGES
+
+def start_xvfb():
+    """
+    Start Xvfb on a free display when there is none.
+    """
+
+    if os.environ.get('DISPLAY'):
+        return None
+
+    try:
+        server = Popen(['Xvfb', '-displayfd', '1', '-screen', '0',
+            '1024x768x24', '-nolisten', 'tcp'], stdout=PIPE)
+    except FileNotFoundError:
+        sys.exit('DISPLAY is not set and Xvfb was not found.')
+    os.environ['DISPLAY'] = ':%s' % server.stdout.readline().decode().strip()
+    return server
+
+def load_vy():
+    """
+    vyapp.app creates the editor when it is imported, it is done with
+    a temporary home so the user's vyrc isn't touched.
+    """
+
+    os.environ['HOME'] = tempfile.mkdtemp()
+    sys.argv = ['vy', '-v']
+
+    from vyapp.app import root
+    return root
+
+def drain(root, spider):
+    """
+    Run tkinter mainloop until the lexer thread and the
+    tagging are done.
+    """
+
+    while spider.busy or spider.funcid:
+        root.update()
+        sleep(0.0005)
+    root.update()
+
+class Counter:
+    """
+    Count the calls to the widget command of a Text widget
+    with a Tcl execution trace.
+    """
+
+    def __init__(self, widget):
+        self.widget = widget
+        self.widget.tk.eval('proc ::bench_count args {incr ::bench_calls}')
+        self.widget.tk.call('trace', 'add', 'execution',
+            widget._w, 'enter', '::bench_count')
+
+    def reset(self):
+        self.widget.tk.setvar('::bench_calls', 0)
+
+    def get(self):
+        return int(self.widget.tk.getvar('::bench_calls'))
+
+def bench_matrix(data, lexer):
+    from vyapp.plugins.syntax.tools import get_tokens_unprocessed_matrix
+
+    start = perf_counter()
+    for ind in get_tokens_unprocessed_matrix(1, 0, data, lexer):
+        pass
+    return perf_counter() - start, 0
+
+def bench_update_all(root, area, spider, counter, filename, data):
+    area.delete('1.0', 'end')
+    area.insert('1.0', data)
+    area.filename = filename
+    area.mark_set('insert', '1.0')
+    area.see('insert')
+    root.update()
+
+    counter.reset()
+    start = perf_counter()
+    spider.update_all()
+    drain(root, spider)
+    return perf_counter() - start, counter.get()
+
+def bench_update(root, area, spider, counter, edits, seed=0):
+    """
+    Insert a line in the visible text then call Spider.update,
+    the time and calls are the mean of each edit.
+    """
+
+    rand    = Random(seed)
+    count   = area.lineindex.count()
+    elapsed = 0
+    calls   = 0
+
+    for ind in range(edits):
+        line = rand.randint(1, count)
+        area.see('%s.0' % line)
+        area.insert('%s.0' % line, rand.choice(('x = 1\n',
+            '"""\n', '/* a */\n', '<b>b</b>\n', '# c\n')))
+        root.update()
+
+        counter.reset()
+        start = perf_counter()
+        spider.update()
+        drain(root, spider)
+        elapsed = elapsed + perf_counter() - start
+        calls   = calls + counter.get()
+    return elapsed / edits, calls / edits
+
+def peak(func, *args):
+    """
+    The peak of python memory while func runs.
+    """
+
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def run(root, area, spider, counter, language, size, edits):
+    from pygments.lexers import get_lexer_for_filename
+
+    filename, data = generate(language, size)
+    lexer          = get_lexer_for_filename(filename)
+    tokens         = sum(1 for ind in lexer.get_tokens_unprocessed(data))
+
+    # Each one runs twice, tracemalloc slows it down a lot.
+    cases = (('get_tokens_unprocessed_matrix', bench_matrix, (data, lexer)),
+        ('update_all', bench_update_all, (root, area, spider, counter,
+            filename, data)),
+        ('update', bench_update, (root, area, spider, counter, edits)))
+
+    results = []
+    for name, func, args in cases:
+        seconds, calls = func(*args)
+
+        results.append({'language': language, 'lines': data.count('\n'),
+            'chars': len(data), 'tokens': tokens, 'bench': name, 
+            'seconds': seconds, 'tcl_calls': calls,
+            'tokens_per_s': tokens / seconds if name != 'update' else None,
+            'peak_bytes': peak(func, *args)})
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Spider benchmarks.')
+    parser.add_argument('--languages', nargs='+', default=list(LANGUAGES),
+        choices=list(LANGUAGES))
+    parser.add_argument('--sizes', nargs='+', type=int,
+        default=[1000, 10000, 50000])
+    parser.add_argument('--edits', type=int, default=20)
+    parser.add_argument('--output', help='File where the results are '
+        'written as json.')
+    args   = parser.parse_args()
+    server = start_xvfb()
+
+    try:
+        report = bench(args)
+    finally:
+        if server:
+            server.terminate()
+
+    if args.output:
+        with open(args.output, 'w') as fd:
+            json.dump(report, fd, indent=2)
+
+def bench(args):
+    import pygments
+    import tkinter
+
+    root = load_vy()
+    from vyapp.areavi import AreaVi
+    from vyapp.plugins.syntax.spider import Spider
+    from vyapp.plugins.syntax.styles.vy import VyStyle
+
+    area = AreaVi('none', root)
+    area.pack(expand=True, fill='both')
+    root.update()
+
+    spider  = Spider(area, VyStyle)
+    counter = Counter(area)
+    results = []
+
+    print('%-12s %7s %-30s %9s %12s %10s %12s' % ('language', 'lines',
+        'bench', 'seconds', 'tokens/s', 'tcl calls', 'peak KiB'))
+
+    for language in args.languages:
+        for size in args.sizes:
+            for result in run(root, area, spider, counter,
+                language, size, args.edits):
+                print('%-12s %7s %-30s %9.4f %12s %10d %12d' % (language,
+                    result['lines'], result['bench'], result['seconds'],
+                        '%.0f' % result['tokens_per_s']
+                            if result['tokens_per_s'] else '-',
+                                result['tcl_calls'],
+                                    result['peak_bytes'] // 1024))
+                results.append(result)
+
+    root.destroy()
+    return {'python': platform.python_version(),
+        'pygments': pygments.__version__, 'tk': tkinter.TkVersion,
+            'results': results}
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Compare adding the syntax tags with one Tk call per token against
+one call per tag and chunk of tokens like Spider does.
+
+Usage:
+
+    xvfb-run python benchmarks/bench_tag_add.py [file ...]
+
+When no file is given the python sources of pygments are used.
+"""
+
+import sys
+import os
+
+# The vyapp of the repository is used when it isn't installed.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vyapp.plugins.syntax.tools import get_tokens_unprocessed_matrix
+from vyapp.plugins.syntax.styles.vy import VyStyle
+from pygments.lexers import get_lexer_for_filename
+from tkinter import Tk, Text
+from time import perf_counter
+import pygments.lexers.python
+import pygments.lexer
+
+def get_tokens_runs(data, lexer):
+    """
+    It returns a list of (tag, srow, scol, erow, ecol) for the 
+    tokens of data.
+    """
+
+    return [(str(token), srow, scol, erow, ecol) 
+        for ((srow, scol), (erow, ecol)), token, value in 
+            get_tokens_unprocessed_matrix(1, 0, data, lexer)]
+
+def per_token(text, runs):
+    for tag, srow, scol, erow, ecol in runs:
+        text.tag_add(tag, '%s.%s' % (srow, scol), '%s.%s' % (erow, ecol))
+    return len(runs)
+
+def grouped(text, runs, chunk=1000, tags=None):
+    calls = 0
+    for ind in range(0, len(runs), chunk):
+        groups = {}
+        for tag, srow, scol, erow, ecol in runs[ind:ind + chunk]:
+            if tags is None or tag in tags:
+                groups.setdefault(tag, []).extend(('%s.%s' % (srow,
+                    scol), '%s.%s' % (erow, ecol)))
+
+        for tag, ranges in groups.items():
+            text.tag_add(tag, *ranges)
+        calls = calls + len(groups)
+    return calls
+
+def styled():
+    """
+    The tags of VyStyle that don't look like the default style.
+    """
+
+    tags = set()
+    for token in VyStyle.styles:
+        conf = VyStyle.style_for_token(token)
+        if (conf['color'] or '957c8b').lower() != '957c8b' \
+            or conf['bgcolor'] or conf['underline']:
+            tags.add(str(token))
+    return tags
+
+def bench(text, data, name, func, runs, *args):
+    text.delete('1.0', 'end')
+    text.insert('1.0', data)
+    text.update()
+
+    start = perf_counter()
+    calls = func(text, runs, *args)
+    text.update()
+    elapsed = perf_counter() - start
+
+    print('%-24s %8d calls %10.3f s %12.0f tokens/s' % (name,
+        calls, elapsed, len(runs) / elapsed))
+
+if __name__ == '__main__':
+    files = sys.argv[1:] or [pygments.lexer.__file__,
+        pygments.lexers.python.__file__]
+
+    root = Tk()
+    text = Text(root)
+    text.pack()
+
+    for filename in files:
+        with open(filename, encoding='utf-8') as fd:
+            data = fd.read()
+
+        lexer = get_lexer_for_filename(filename, '')
+        runs  = get_tokens_runs(data, lexer)
+        print('%s: %s lines, %s tokens' % (filename,
+            data.count('\n'), len(runs)))
+
+        bench(text, data, 'one call per token', per_token, runs)
+        bench(text, data, 'grouped by tag', grouped, runs)
+        bench(text, data, 'grouped, styled only', grouped, runs, 1000, styled())
+
+    root.destroy()
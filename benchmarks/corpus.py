@@ -0,0 +1,145 @@
+"""
+Generated source files used by the benchmarks. The text is built
+from snippets of each language with random names and numbers, the same
+seed gives the same text.
+"""
+
+from random import Random
+
+WORDS = ('data', 'index', 'value', 'count', 'buffer', 'node', 'item',
+    'offset', 'result', 'state', 'token', 'line', 'name', 'size', 'area')
+
+PYTHON = (
+'''def {name}_{num}({word}, {other}=None):
+    """
+    Return the {word} of {other} as {text}.
+    """
+
+    if {other} is None:
+        return {num}
+    return [{word} + x for x in range({num})]
+
+''',
+'''class {Name}{num}:
+    # {text}
+    {word} = {num}
+
+    def __init__(self, {other}):
+        self.{other} = {other}
+        self.{word}  = '{text}'
+
+    def {name}(self):
+        return self.{other}.get('{word}', {num}.5)
+
+''',
+'''for {word} in {other}:
+    try:
+        {name}[{word}] = {word} * {num}
+    except KeyError as e:
+        print("{text} %s" % e)
+
+''',
+'''{name} = {{'{word}': {num}, '{other}': r'\\d+{text}', 'flag': True}}
+
+''',
+)
+
+C = (
+'''/*
+ * {text}
+ */
+static int {name}_{num}(int {word}, const char *{other})
+{{
+    int i;
+    for (i = 0; i < {num}; i++) {{
+        if ({other}[i] == '\\n')
+            {word} += 0x{num:x};
+    }}
+    return {word};
+}}
+
+''',
+'''#include <stdio.h>
+#define {NAME}_{num} {num}
+
+struct {name} {{
+    long {word};
+    char *{other}; /* {text} */
+}};
+
+''',
+'''void {name}(struct {word} *{other})
+{{
+    printf("{text}: %d\\n", {other}->{word});
+    {other}->{word} = {num}.{num}f;
+}}
+
+''',
+)
+
+JAVASCRIPT = (
+'''function {name}{num}({word}, {other}) {{
+    // {text}
+    const {name} = {word}.map((x) => x * {num});
+    return `${{{other}}} {text}`;
+}}
+
+''',
+'''class {Name} extends Base {{
+    constructor({word}) {{
+        super();
+        this.{word} = /{word}[0-9]+/g.test({word});
+        this.{other} = {{ '{name}': {num}, value: null }};
+    }}
+}}
+
+''',
+'''let {name} = [{num}, '{text}', true];
+/* {text} */
+if ({name}.length > {num}) {{
+    console.log("{word}", {name});
+}}
+
+''',
+)
+
+HTML = (
+'''<div class="{name}" id="{word}{num}">
+  <p>{text} <a href="/{word}/{num}">{other}</a></p>
+  <!-- {text} -->
+</div>
+''',
+'''<ul>
+  <li data-{word}="{num}">{text}</li>
+  <li><em>{other}</em> &amp; {name}</li>
+</ul>
+''',
+'''<script type="text/javascript">
+  var {name} = {{ {word}: {num} }};
+</script>
+''',
+)
+
+LANGUAGES = {'python': ('.py', PYTHON), 'c': ('.c', C),
+    'javascript': ('.js', JAVASCRIPT), 'html': ('.html', HTML)}
+
+def generate(language, lines, seed=0):
+    """
+    It returns (filename, text) with about lines lines of language.
+    """
+
+    extension, snippets = LANGUAGES[language]
+    rand  = Random(seed)
+    parts = []
+    count = 0
+
+    while count < lines:
+        name, word, other = (rand.choice(WORDS) for ind in range(3))
+        text = ' '.join(rand.choice(WORDS) for ind in range(rand.randint(1, 8)))
+        part = rand.choice(snippets).format(name=name, Name=name.title(),
+            NAME=name.upper(), word=word, other=other, text=text,
+                num=rand.randint(0, 10000))
+
+        parts.append(part)
+        count = count + part.count('\n')
+    return 'corpus%s' % extension, ''.join(parts)
@@ -0,0 +1,31 @@
+"""
+The modules that plugins import need vyapp.app, importing it creates
+the editor. The tests run without a display so it is replaced by a
+module whose root does nothing.
+"""
+
+import types
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class Status:
+    def set_msg(self, msg):
+        self.msg = msg
+
+class Root:
+    status = Status()
+
+    def after(self, ms, func, *args):
+        return None
+
+    def after_idle(self, func, *args):
+        return None
+
+    def after_cancel(self, funcid):
+        pass
+
+app      = types.ModuleType('vyapp.app')
+app.root = Root()
+sys.modules.setdefault('vyapp.app', app)
@@ -0,0 +1,77 @@
+"""
+The pairs of the brackets index are compared with the ones of a naive
+search over the text as it is edited.
+"""
+
+from random import Random
+from vyapp.brackets import Brackets
+import pytest
+
+PAIRS = [('(', ')'), ('[', ']'), ('{', '}')]
+
+class Area:
+    def __init__(self, text):
+        self.text = text
+
+    def get(self, index0, index1):
+        return self.text + '\n'
+
+    def edit(self, brackets, pos0, pos1, data):
+        self.text = self.text[:pos0] + data + self.text[pos1:]
+        brackets.update(pos0, pos1, data)
+
+def naive(text, pos, start, end):
+    if pos >= len(text) or text[pos] not in (start, end):
+        return None
+
+    step  = 1 if text[pos] == start else -1
+    count = 0
+    while 0 <= pos < len(text):
+        char  = text[pos]
+        count = count + (char == start) - (char == end)
+        if not count:
+            return pos
+        pos = pos + step
+    return None
+
+def bounded(text, pos, start, end, max):
+    match = naive(text, pos, start, end)
+    return None if match is None or abs(match - pos) > max else match
+
+def lookup(area, brackets, rand, max=None):
+    for ind in range(20):
+        pos = rand.randrange(len(area.text) + 1)
+        for start, end in PAIRS:
+            expected = naive(area.text, pos, start, end) if max is None \
+                else bounded(area.text, pos, start, end, max)
+            assert brackets.pair(pos, start, end, max) == expected
+
+@pytest.mark.parametrize('max', [None, 0, 5, 40])
+def test_edits(max):
+    for seed in range(30):
+        rand = Random(seed)
+        area = Area(''.join(rand.choice('()[]{}ab\n') for ind in range(200)))
+        brackets = Brackets(area)
+
+        for ind in range(40):
+            pos0 = rand.randrange(len(area.text) + 1)
+            pos1 = min(len(area.text), pos0 + rand.choice([0, 1, 5, 30]))
+            data = ''.join(rand.choice('()[]{}a') for ind in range(
+                rand.randrange(6)))
+            area.edit(brackets, pos0, pos1, data)
+            lookup(area, brackets, rand, rand.choice([None, max]))
+
+def test_misses():
+    """
+    The misses are cached until an edit closes the pair.
+    """
+
+    area     = Area('(' + 'a' * 100)
+    brackets = Brackets(area)
+    assert brackets.pair(0, '(', ')') is None
+    assert (0, None) in brackets.misses
+
+    area.edit(brackets, 101, 101, ')')
+    assert brackets.pair(0, '(', ')') == 101
+    assert brackets.pair(0, '(', ')', 50) is None
+    assert brackets.pair(101, '(', ')', 101) == 0
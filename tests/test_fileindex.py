@@ -0,0 +1,88 @@
+"""
+The tables of FileIndex are compared with the files that a naive walk
+finds, before and after the folders change.
+"""
+
+from random import Random
+from vyapp.fileindex import FileIndex
+import pytest
+import sys
+import re
+import os
+
+def naive(top):
+    paths = set()
+    for path, names, files in os.walk(top):
+        names[:] = [ind for ind in names if not ind.startswith(('.', 'skip'))]
+        paths.add((path, True))
+        paths.update((os.path.join(path, ind), False) for ind in files
+            if not ind.startswith('.') and not ind.endswith('.pyc'))
+    return paths
+
+def table(index):
+    return {(path, isdir) for path, lower, isdir in index.get_table()}
+
+def make(top, rand, count):
+    for ind in range(count):
+        path = top.joinpath(*rand.sample(['a', 'b', 'c', 'skip'],
+            rand.randrange(3)))
+        path.mkdir(parents=True, exist_ok=True)
+        path.joinpath(rand.choice(['f%s.py', 'f%s.pyc', '.f%s']) % ind).touch()
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    monkeypatch.setattr(FileIndex, 'interval', 0)
+    tmp_path.joinpath('.gitignore').write_text('skip*/\n*.pyc\n')
+    make(tmp_path, Random(0), 50)
+
+    index = FileIndex([str(tmp_path)])
+    index.thread.join()
+    return index
+
+def test_build(tmp_path, index):
+    assert table(index) == naive(str(tmp_path))
+
+def test_refresh(tmp_path, index):
+    rand = Random(1)
+    make(tmp_path, rand, 20)
+    assert table(index) == naive(str(tmp_path))
+
+    for path in list(tmp_path.joinpath('a').rglob('*')):
+        if path.is_file():
+            path.unlink()
+    assert table(index) == naive(str(tmp_path))
+
+    os.rename(str(tmp_path / 'b'), str(tmp_path / 'd'))
+    assert table(index) == naive(str(tmp_path))
+
+def test_deep(tmp_path):
+    """
+    The folders are walked without recursion.
+    """
+
+    path = str(tmp_path)
+    for ind in range(sys.getrecursionlimit() + 100):
+        path = os.path.join(path, 'd')
+        os.mkdir(path)
+    open(os.path.join(path, 'file'), 'w').close()
+
+    try:
+        index = FileIndex([str(tmp_path)])
+        index.thread.join()
+        assert (os.path.join(path, 'file'), False) in table(index)
+    finally:
+        # shutil.rmtree would hit the recursion limit too.
+        os.remove(os.path.join(path, 'file'))
+        while path != str(tmp_path):
+            os.rmdir(path)
+            path = os.path.dirname(path)
+
+def test_rank(tmp_path, index):
+    paths = {path for path, isdir in naive(str(tmp_path)) if not isdir}
+    for pattern in ['f1', 'af', 'b f2', 'xyz', 'cf3']:
+        chars = pattern.replace(' ', '')
+        regex = re.compile('.*'.join(map(re.escape, chars)))
+        hits  = index.rank(pattern, limit=1000)
+
+        assert set(hits) == {ind for ind in paths if regex.search(ind.lower())}
+        assert len(hits) == len(set(hits))
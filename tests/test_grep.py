@@ -0,0 +1,91 @@
+"""
+The in process search is compared with a naive one over the lines
+of the files, there is a hit for each match like ag --vimgrep gives.
+The ag commands of Sniper and Fstmt are parsed back.
+"""
+
+from random import Random
+from vyapp import grep
+import pytest
+import re
+import os
+
+WORDS = ['foo', 'Foo', 'bar', '->foo', '--x', 'a.b', 'x\ty', '']
+
+@pytest.fixture
+def tree(tmp_path):
+    rand = Random(0)
+    for ind in range(30):
+        path = tmp_path.joinpath(*rand.sample('abc', rand.randrange(3)))
+        path.mkdir(parents=True, exist_ok=True)
+        lines = (' '.join(rand.choices(WORDS, k=4)) for ind in range(20))
+        path.joinpath('f%s.txt' % ind).write_text('\n'.join(lines))
+
+    tmp_path.joinpath('.hidden').write_text('foo\n')
+    tmp_path.joinpath('bin.txt').write_bytes(b'foo\0\n')
+    return tmp_path
+
+def naive(dirs, pattern, flags):
+    hits = []
+    for top in dirs:
+        for path, names, files in os.walk(top):
+            names[:] = [ind for ind in names if not ind.startswith('.')]
+            for name in files:
+                if name.startswith('.') or name == 'bin.txt':
+                    continue
+                name = os.path.join(path, name)
+                with open(name) as fd:
+                    for line, text in enumerate(fd.read().split('\n'), 1):
+                        hits.extend((name, str(line), text) for match
+                            in re.finditer(pattern, text, flags) if match.group())
+    return sorted(hits)
+
+def run(*args, **kwargs):
+    return sorted(ind for hits in grep.scan(*args, **kwargs) for ind in hits)
+
+@pytest.mark.parametrize('pattern, kwargs, flags', [
+    ('foo', {}, re.I),
+    ('Foo', {}, 0),
+    ('foo', {'nocase': False}, 0),
+    ('a.b', {'literal': True}, re.I),
+    ('->foo', {'literal': True}, re.I),
+    ('x[ \\t]+y', {}, re.I),
+    ('^bar', {}, re.I)])
+def test_scan(tree, pattern, kwargs, flags):
+    regex = re.escape(pattern) if kwargs.get('literal') else pattern
+    assert run([str(tree)], pattern, workers=1, **kwargs) \
+        == naive([str(tree)], regex, flags)
+
+def test_workers(tree):
+    assert run([str(tree)], 'bar', workers=2, chunk=4) \
+        == naive([str(tree)], 'bar', re.I)
+
+def test_walk(tree):
+    tree.joinpath('.gitignore').write_text('a/\n/b/*.txt\n')
+    files = set(grep.walk([str(tree), str(tree / 'c')], ignore=['f1*']))
+
+    for path in files:
+        rel = os.path.relpath(path, str(tree))
+        assert not rel.startswith('a/') and '/a/' not in rel
+        assert not re.match('b/[^/]*$', rel)
+        assert not os.path.basename(rel).startswith(('f1', '.'))
+    assert len(files) == len(set(map(os.path.realpath, files)))
+
+    files = grep.walk([str(tree)], file_regex='f2[0-9]')
+    assert all(re.search('f2[0-9]', ind) for ind in files)
+
+@pytest.mark.parametrize('cmd, pattern, dirs, opts', [
+    (['ag', '--vimgrep', '-Q', '--', '->foo', '/a', '/b'],
+        '->foo', ['/a', '/b'], {'literal': True}),
+    (['ag', '-Q', '--x', '/a'], '--x', ['/a'], {'literal': True}),
+    (['ag', '--ignore', '*.pyc', '-G', 'py$', '-s', '--nomultiline',
+        '--', '-x', '/a', '-b'], '-x', ['/a', '-b'],
+        {'ignore': ['*.pyc'], 'file_regex': 'py$', 'nocase': False,
+        'multiline': False}),
+    (['ag', '-i', 'foo', '-Q', None], 'foo', ['-Q'], {'nocase': True}),
+    (['ag', '--', 'foo'], 'foo', [os.getcwd()], {})])
+def test_parse_cmd(cmd, pattern, dirs, opts):
+    default = {'ignore': [], 'file_regex': '', 'nocase': None,
+        'literal': False, 'multiline': True}
+    default.update(opts)
+    assert grep.parse_cmd(cmd) == (pattern, dirs, default)
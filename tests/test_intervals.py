@@ -0,0 +1,84 @@
+"""
+The intervals are compared with a naive list that is shifted
+at each edit and searched from start to end.
+"""
+
+from random import Random
+from vyapp.intervals import Intervals
+import pytest
+
+class Naive:
+    def __init__(self):
+        self.entries = {}
+
+    def add(self, id, start, end, data):
+        self.entries.pop(id, None)
+        self.entries[id] = (start, end, data)
+
+    def remove(self, id):
+        self.entries.pop(id, None)
+
+    def shift(self, pos0, pos1, size):
+        delta = size - (pos1 - pos0)
+        for id, (start, end, data) in list(self.entries.items()):
+            if end <= pos0:
+                continue
+            if start >= pos0:
+                start = start + delta if start >= pos1 else pos0 + size
+            end = end + delta if end > pos1 else pos0
+
+            if end > start:
+                self.entries[id] = (start, end, data)
+            else:
+                del self.entries[id]
+
+    def find(self, pos0, pos1=None):
+        pos1 = pos0 + 1 if pos1 is None else max(pos1, pos0 + 1)
+        return [id for id, (start, end, data) in self.entries.items()
+            if start < pos1 and end > pos0]
+
+@pytest.mark.parametrize('adds', [0.02, 0.3])
+def test_random(adds):
+    for seed in range(30):
+        rand  = Random(seed)
+        inst  = Intervals()
+        naive = Naive()
+        size  = 500
+
+        for ind in range(300):
+            choice = rand.random()
+            if choice < adds or not naive.entries:
+                start = rand.randrange(size + 1)
+                end   = start + rand.randrange(1, 40)
+                id    = rand.randrange(100)
+                inst.add(id, start, end, ind)
+                naive.add(id, start, end, ind)
+            elif choice < 0.4:
+                id = rand.choice(list(naive.entries))
+                inst.remove(id)
+                naive.remove(id)
+            elif choice < 0.8:
+                pos0 = rand.randrange(size + 1)
+                pos1 = min(size, pos0 + rand.choice([0, 1, 5, 50]))
+                data = rand.choice([0, 1, 3, 20])
+                inst.shift(pos0, pos1, data)
+                naive.shift(pos0, pos1, data)
+                size = size + data - (pos1 - pos0)
+            else:
+                pos0 = rand.randrange(size + 1)
+                pos1 = rand.choice([None, pos0 + rand.randrange(60)])
+                assert inst.find(pos0, pos1) == naive.find(pos0, pos1)
+
+            assert len(inst) == len(naive.entries)
+            for id, entry in naive.entries.items():
+                assert inst.get(id) == entry
+
+def test_clear():
+    inst = Intervals()
+    inst.add('a', 0, 10, None)
+    inst.find(0)
+    inst.shift(0, 0, 5)
+    inst.clear()
+    assert inst.find(0, 100) == []
+    inst.add('b', 2, 4, None)
+    assert inst.find(3) == ['b']
@@ -0,0 +1,69 @@
+"""
+The line index is compared with the lines of the text as it is edited,
+the blocks are made small so they are split and merged often.
+"""
+
+from random import Random
+from vyapp.lineindex import LineIndex, Fenwick
+import pytest
+
+def index(text, pos):
+    line = text.count('\n', 0, pos) + 1
+    return line, pos - text.rfind('\n', 0, pos) - 1
+
+def check(inst, text):
+    lines = text.split('\n')[:-1]
+    assert inst.count() == len(lines)
+
+    pos = 0
+    for line, data in enumerate(lines, 1):
+        assert inst.length(line) == len(data) + 1
+        assert inst.offset(line, 0) == pos
+        pos = pos + len(data) + 1
+
+    for pos in range(len(text)):
+        assert inst.index(pos) == index(text, pos)
+
+@pytest.mark.parametrize('size', [1, 4, 512])
+def test_edits(monkeypatch, size):
+    monkeypatch.setattr(LineIndex, 'size', size)
+    for seed in range(30):
+        rand = Random(seed)
+        inst = LineIndex()
+
+        # The text always ends with the newline of the widget.
+        text = '\n'
+        for ind in range(60):
+            pos0 = rand.randrange(len(text))
+            pos1 = min(len(text) - 1, pos0 + rand.choice([0, 1, 3, 20, 200]))
+            data = ''.join(rand.choice('ab\n') for ind in
+                range(rand.choice([0, 1, 5, 40])))
+
+            inst.replace(index(text, pos0), index(text, pos1), data)
+            text = text[:pos0] + data + text[pos1:]
+        check(inst, text)
+
+def test_clamp():
+    inst = LineIndex()
+    inst.replace((1, 0), (1, 0), 'abc\nde')
+    assert inst.clamp(5, 3) == (2, 2)
+    assert inst.clamp(1, 2) == (1, 2)
+
+def test_fenwick():
+    rand   = Random(0)
+    values = [rand.randrange(5) for ind in range(100)]
+    tree   = Fenwick(values)
+
+    for ind in range(200):
+        k = rand.randrange(100)
+        delta = rand.randrange(5) - values[k]
+        values[k] = values[k] + delta
+        tree.add(k, delta)
+
+        k = rand.randrange(101)
+        assert tree.prefix(k) == sum(values[:k])
+
+        value = rand.randrange(sum(values) or 1)
+        k, total = tree.search(value)
+        assert total == sum(values[:k]) <= value
+        assert k == len(values) or value < total + values[k]
@@ -0,0 +1,244 @@
+"""
+The lexer states and runs that Spider keeps as the text is edited are
+compared with the ones of lexing the whole text again.
+"""
+
+from random import Random
+from bisect import bisect_right
+from pygments.lexers import PythonLexer, JavascriptLexer, PythonConsoleLexer
+from pygments.styles.default import DefaultStyle
+from pygments.token import STANDARD_TYPES
+from vyapp.plugins.syntax.tools import get_lines_runs, get_tokens_states
+from vyapp.plugins.syntax import spider
+from vyapp.lineindex import LineIndex
+import pytest
+
+PYTHON = '''def f(x):
+    """doc
+    string"""
+    s = 'abc' + "d\\"e"
+    return x  # c
+class A(B):
+    x = 1.5e3
+'''
+
+JAVASCRIPT = '''var s = "abc\\
+def";
+function f(x) { /* c
+ m */ return `t${x}
+ u`; }
+'''
+
+LEXERS = [(PYTHON, PythonLexer), (JAVASCRIPT, JavascriptLexer)]
+
+# Inserting them doesn't close a token that failed to match
+# further up, see Spider.on_edit.
+SAFE = ['#', '\n', '\n\n', 'def ', ' x ', '(', ')', '{', '}', 'return']
+ANY  = SAFE + ['"""', "'", '"', '/*', '*/', '`', '\\']
+
+class Worker:
+    def submit(self, func, args, callback):
+        callback(func(*args))
+
+class Area:
+    """
+    The part of AreaVi that Spider uses, the text is a str.
+    """
+
+    def __init__(self, text, filename):
+        self.filename  = filename
+        self.view      = None
+        self.text      = ''
+        self.lineindex = LineIndex()
+        self.hooks     = []
+        self.edit(0, 0, text.rstrip('\n'))
+
+    def offset(self, index):
+        if index == 'end':
+            return len(self.text) + 1
+
+        index, _, mod = index.partition(' ')
+        line, col     = map(int, index.split('.'))
+        if line > self.lineindex.count():
+            return len(self.text) + 1
+        if mod == 'lineend':
+            col = self.lineindex.length(line) - 1
+        return self.lineindex.offset(line, col)
+
+    def get(self, index0, index1):
+        return (self.text + '\n')[self.offset(index0):self.offset(index1)]
+
+    def edit(self, pos0, pos1, data):
+        index0 = self.lineindex.index(pos0)
+        index1 = self.lineindex.index(pos1)
+        self.last = (index0, index1, data)
+        self.text = self.text[:pos0] + data + self.text[pos1:]
+        self.lineindex.replace(index0, index1, data)
+        for handle in self.hooks:
+            handle(index0, index1, pos0, pos1, data)
+
+    def add_edit_hook(self, handle):
+        self.hooks.append(handle)
+
+    def winfo_exists(self):
+        return True
+
+    def configure(self, **kwargs):
+        pass
+
+    def tag_configure(self, *args, **kwargs):
+        pass
+
+    def install(self, *args):
+        pass
+
+    def tag_lower(self, *args):
+        pass
+
+    def tag_add(self, *args):
+        pass
+
+    def tag_remove(self, *args):
+        pass
+
+@pytest.fixture(autouse=True)
+def worker(monkeypatch):
+    monkeypatch.setattr(spider.Spider, 'WORKER', Worker())
+    monkeypatch.setattr(spider, 'consume_iter', lambda seq: list(seq))
+
+def make(text, lexer, filename='file'):
+    area  = Area(text, filename)
+    inst  = spider.Spider(area, DefaultStyle)
+    inst.lexer = lexer()
+    inst.tags  = set(map(str, STANDARD_TYPES))
+    inst.relex(1, area.lineindex.count())
+    return area, inst
+
+def check(area, inst):
+    """
+    Compare the runs and the states with the ones of a full lex.
+    """
+
+    text  = area.text + '\n'
+    runs  = get_lines_runs(text, inst.lexer, inst.tags)
+    count = area.lineindex.count()
+    assert inst.runs[:count] == runs[:count]
+
+    # Lexers with default transitions have more than one
+    # state at the start of a line.
+    states = {1: {('root',)}}
+    for pos, token, value in get_tokens_states(inst.lexer, text):
+        if token is None:
+            states.setdefault(text.count('\n', 0, pos) + 1, set()).add(value)
+
+    inst.settle()
+    for line, stack in zip(inst.lines, inst.stacks):
+        assert stack in states.get(line, ())
+
+def edit(area, rand, snippets, size):
+    pos0 = rand.randrange(len(area.text) + 1)
+    pos1 = min(len(area.text), pos0 + rand.choice(size))
+    area.edit(pos0, pos1, rand.choice(snippets))
+
+@pytest.mark.parametrize('step', [1, 4, 50])
+@pytest.mark.parametrize('text, lexer', LEXERS)
+def test_edits(monkeypatch, text, lexer, step):
+    monkeypatch.setattr(spider.Spider, 'step', step)
+    for seed in range(40):
+        rand = Random(seed)
+        area, inst = make(text * 10, lexer)
+
+        for ind in range(30):
+            edit(area, rand, SAFE, [0])
+            if rand.random() < 0.2:
+                inst.update()
+            elif rand.random() < 0.2:
+                inst.update_live()
+        inst.update()
+        check(area, inst)
+
+@pytest.mark.parametrize('text, lexer, pos, data', [
+    # Close the docstring earlier and open it again.
+    (PYTHON * 3, PythonLexer, PYTHON.index('string'), '"""\n"""'),
+    # End the string that goes over the lines.
+    (JAVASCRIPT * 3, JavascriptLexer, JAVASCRIPT.index('def'), '"\n"'),
+    # The blank lines before the state are a single token.
+    ('var a;\n\nvar b;\n', JavascriptLexer, 8, '\n')])
+def test_tokens_over_lines(monkeypatch, text, lexer, pos, data):
+    monkeypatch.setattr(spider.Spider, 'step', 1)
+    area, inst = make(text, lexer)
+    area.edit(pos, pos, data)
+    inst.update()
+    check(area, inst)
+
+@pytest.mark.parametrize('text, lexer', LEXERS)
+def test_save(text, lexer):
+    for seed in range(20):
+        rand = Random(seed)
+        area, inst = make(text * 10, lexer, 'file.%s' % (
+            'py' if lexer is PythonLexer else 'js'))
+
+        for ind in range(30):
+            edit(area, rand, ANY, [0, 1, 3, 10])
+            if rand.random() < 0.3:
+                inst.update()
+
+        inst.update_saved()
+        check(area, inst)
+
+def test_lag():
+    """
+    The lines of the states are shifted lazily like they would be
+    at each edit.
+    """
+
+    rand = Random(0)
+    area, inst = make(PYTHON * 50, PythonLexer)
+    lines = list(inst.lines)
+
+    for ind in range(500):
+        edit(area, rand, SAFE, [0, 1, 30, 200])
+        (line0, col0), (line1, col1), data = area.last
+
+        k0 = bisect_right(lines, line0)
+        k1 = bisect_right(lines, line1)
+        delta = data.count('\n') - (line1 - line0)
+        lines[k0:k1] = []
+        lines[k0:] = [line + delta for line in lines[k0:]]
+
+    inst.settle()
+    assert inst.lines == lines
+
+def test_idle(monkeypatch):
+    """
+    The visible lines of lexers that can't be resumed are lexed again
+    only when they were edited or scrolled.
+    """
+
+    area = Area('>>> x = 1\n' * 10, 'file')
+    inst = spider.Spider(area, DefaultStyle)
+    inst.lexer = PythonConsoleLexer()
+    shown, tagged = [(1, 5)], []
+    monkeypatch.setattr(inst, 'visible', lambda: shown[0])
+    monkeypatch.setattr(inst, 'tag_tokens', lambda *args: tagged.append(args))
+    monkeypatch.setattr(area, 'index', lambda index: index, raising=False)
+    monkeypatch.setattr(area, 'winfo_height', lambda: 100, raising=False)
+    monkeypatch.setattr(area, 'winfo_width', lambda: 100, raising=False)
+    monkeypatch.setattr(area, 'tag_next_occur', 
+        lambda *args: args[1], raising=False)
+    monkeypatch.setattr(area, 'tag_prev_occur', 
+        lambda *args: args[1], raising=False)
+
+    inst.update()
+    inst.update()
+    assert len(tagged) == 1
+
+    area.edit(3, 3, 'y')
+    inst.update()
+    inst.update()
+    assert len(tagged) == 2
+
+    shown[0] = (2, 6)
+    inst.update()
+    inst.update()
+    assert len(tagged) == 3
@@ -0,0 +1,94 @@
+"""
+The searches narrowed by the trigram indexes are compared with the
+ones over all the files, as the files change and after the indexes
+are loaded from their files.
+"""
+
+from random import Random
+from vyapp import grep, trigram
+import pytest
+import re
+
+WORDS = ['foo', 'Foo_bar', 'baz', 'quux', 'hello', 'world', 'aaa', 'x',
+    'yz', 'abc', 'abd', 'héllo', '->', '\t']
+
+PATTERNS = ['foo', 'foo_bar', 'ba[rz]', '(abc|abd)', 'x+yz', 'hello.world',
+    'a{3}', r'\bquux\b', '(?i)FOO', 'zzz', 'héllo', 'q.*x', '']
+
+def write(path, rand):
+    lines = (' '.join(rand.choices(WORDS, k=5)) for ind in range(10))
+    path.write_text('\n'.join(lines), encoding='utf-8')
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    monkeypatch.setattr(trigram, 'INDEXES', {})
+    monkeypatch.setattr(grep, 'INDEX', None)
+
+    rand = Random(0)
+    top  = tmp_path / 'top'
+    for ind in range(40):
+        path = top.joinpath(*rand.sample('ab', rand.randrange(2)))
+        path.mkdir(parents=True, exist_ok=True)
+        write(path / ('f%s.txt' % ind), rand)
+    (tmp_path / 'index').mkdir()
+    return top
+
+def run(dirs, pattern, **kwargs):
+    return sorted(ind for hits in grep.scan(dirs, pattern,
+        workers=1, **kwargs) for ind in hits)
+
+def compare(tree, monkeypatch):
+    for pattern in PATTERNS:
+        for kwargs in ({}, {'ignore': ['a'], 'file_regex': 'f1'}):
+            monkeypatch.setattr(grep, 'INDEX', None)
+            expected = run([str(tree)], pattern, **kwargs)
+            monkeypatch.setattr(grep, 'INDEX', str(tree.parent / 'index'))
+            assert run([str(tree)], pattern, **kwargs) == expected
+
+def test_narrow(tree, monkeypatch):
+    compare(tree, monkeypatch)
+
+    rand  = Random(1)
+    files = sorted(tree.rglob('*.txt'))
+    for path in rand.sample(files, 10):
+        write(path, rand)
+    for path in rand.sample(files, 5):
+        path.unlink()
+    write(tree / 'new.txt', rand)
+    compare(tree, monkeypatch)
+
+    # The indexes are read from their files.
+    monkeypatch.setattr(trigram, 'INDEXES', {})
+    compare(tree, monkeypatch)
+
+def test_compact(tree):
+    index = trigram.Index(str(tree), str(tree.parent / 'index' / 'x'))
+    index.update(workers=1)
+    grams = trigram.get_required('foo_bar', 0, 'utf-8')
+    paths = index.search(grams)
+
+    for path in paths[:3]:
+        index.remove(path)
+    index.dead = len(index.files)
+    index.dump()
+
+    loaded = trigram.Index(str(tree), index.path)
+    assert loaded.load()
+    assert loaded.search(grams) == paths[3:]
+    assert loaded.dead == 0
+
+@pytest.mark.parametrize('seed', range(5))
+def test_required(seed):
+    """
+    The text of any match has the trigrams that are required.
+    """
+
+    rand = Random(seed)
+    for ind in range(200):
+        text = ' '.join(rand.choices(WORDS, k=8))
+        for pattern in PATTERNS:
+            for flags in (0, re.I):
+                if re.search(pattern, text, flags):
+                    data = text.encode('utf-8')
+                    assert trigram.get_required(pattern, flags, 'utf-8') \
+                        <= trigram.get_grams(data)
@@ -3,15 +3,98 @@
 """
 
 from vyapp.mixins import DataEvent, IdleEvent
-from tkinter import Text, IntVar
+from vyapp.snapshot import Snapshot
+from vyapp.mmapview import MmapView
+from vyapp.lineindex import LineIndex
+from vyapp.writer import Writer
+from vyapp.intervals import Intervals
+from vyapp.brackets import Brackets
+from traceback import print_exc as debug
+from tkinter import Text, IntVar, TclError
+import codecs
+import re
 import os
 
+# Tcl lambda used by AreaVi.isearch_all. It finds all the matches 
+# then maps each one of them to [chunk index0 index1] in the interpreter.
+SEARCH_ALL = '''{w opts pattern index stopindex} {
+    set counts {}
+    set starts [$w search {*}$opts -all -count counts -- \\
+    $pattern $index {*}$stopindex]
+
+    lmap start $starts count $counts {
+        set end [$w index "$start +${count}c"]
+        list [$w get $start $end] $start $end
+    }
+}'''
+
+# Tcl lambda used by AreaVi.replace_matches. The edits come from the
+# last match to the first one and are grouped as a single undo step.
+REPLACE_ALL = '''{w edits} {
+    set autoseparators [$w cget -autoseparators]
+    $w configure -autoseparators 0
+    $w edit separator
+
+    foreach {index0 index1 data} $edits {
+        $w delete $index0 $index1
+        $w insert $index0 $data
+    }
+
+    $w edit separator
+    $w configure -autoseparators $autoseparators
+}'''
+
+# Body of the Tcl proc that takes the place of the widget command of 
+# AreaVi instances. Edits are passed to the renamed widget command then 
+# reported to python with the indexes they had before the edit.
+EDIT_PROXY = '''
+    set cmd [lindex $args 0]
+    if {$cmd ni {insert delete replace} || [%(orig)s cget -state] eq "disabled"} {
+        tailcall %(orig)s {*}$args
+    }
+
+    if {$cmd eq "insert"} {
+        set indexes [list [%(orig)s index [lindex $args 1]]]
+    } elseif {$cmd eq "replace"} {
+        set indexes [lmap index [lrange $args 1 2] {%(orig)s index $index}]
+    } elseif {[llength $args] == 2} {
+        set index   [lindex $args 1]
+        set indexes [list [%(orig)s index $index] [%(orig)s index "$index +1c"]]
+    } else {
+        set indexes [lmap index [lrange $args 1 end] {%(orig)s index $index}]
+    }
+
+    %(orig)s {*}$args
+    %(hook)s $indexes {*}$args
+'''
+
 class AreaVi(Text, DataEvent, IdleEvent):
     INPUT  = None
     # Plugins should commonly use self.project
     # if it fails then use HOME.
     HOME   = ''
 
+    # Files bigger than LOAD_THRESHOLD bytes are loaded in chunks
+    # of LOAD_CHUNK bytes, set it to None to always load at once.
+    LOAD_THRESHOLD = 8 * 1024 * 1024
+    LOAD_CHUNK     = 512 * 1024
+
+    # Files bigger than MMAP_THRESHOLD bytes are opened as a read only
+    # MmapView, set it to None to disable it.
+    MMAP_THRESHOLD = 1024 * 1024 * 1024
+
+    # When ASYNC_SAVE is True the text is encoded and written by the
+    # Writer thread. When FSYNC is True the file is flushed to the disk 
+    # before <<SaveData>> is generated.
+    ASYNC_SAVE = False
+    FSYNC      = False
+    WRITER     = None
+
+    # The AreaVi instances that are alive in creation order
+    # and the last one that was set for each filename.
+    AREAS = {}
+    FILES = {}
+
     def __init__(self, default_filename, *args, **kwargs):
         """
         This class receives all Text widget arguments
@@ -24,9 +107,20 @@ class AreaVi(Text, DataEvent, IdleEvent):
         """
 
         Text.__init__(self, *args, **kwargs)
+
+        # The length of the lines, it is updated on every edit
+        # that goes through the widget command.
+        self.lineindex  = LineIndex()
+        self.edit_hooks = []
+        self.redirect()
+
         DataEvent.__init__(self, self)
         IdleEvent.__init__(self, self)
 
+        AreaVi.AREAS[self] = None
+        self.bind('<Destroy>', lambda event: self.unregister(), add=True)
+        self._filename = None
+
         self.setup = dict()
 
         # Maybe it should be?
@@ -41,18 +135,172 @@ class AreaVi(Text, DataEvent, IdleEvent):
 
         self.charset  = 'utf-8'
         self.map      = {}
-        self.db       = {}
         self.project  = ''
         self.assoc_c  = 0
 
+        # The data set with set_assoc_data, it is kept as offsets
+        # that follow the edits.
+        self.assoc    = Intervals()
+        self.add_edit_hook(lambda index0, index1, pos0, pos1, data: 
+            self.assoc.shift(pos0, pos1, len(data)))
+
+        # The brackets index used by case_pair.
+        self.brackets = Brackets(self)
+        self.add_edit_hook(lambda index0, index1, pos0, pos1, data: 
+            self.brackets.update(pos0, pos1, data))
+
         # The character used for indentation.
         self.tabchar = ' '
         self.tabsize = 4
 
+        # The after id of the chunked load and the
+        # position set with setcur while it happens.
+        self.loader  = None
+        self.loadfd  = None
+        self.loadcur = None
+
+        # The MmapView when the file is too big to be loaded.
+        self.view    = None
+
         def set_input(e):
             AreaVi.INPUT = e.widget
         self.hook('AreaVi', '-1', '<FocusIn>', set_input)
 
+    @property
+    def filename(self):
+        """
+        The file's path and name. Setting it updates AreaVi.FILES.
+        """
+
+        return self._filename
+
+    @filename.setter
+    def filename(self, filename):
+        self.unregister_file()
+        self._filename = filename
+        AreaVi.FILES[filename] = self
+
+    def unregister_file(self):
+        """
+        Remove the AreaVi instance from AreaVi.FILES. If other
+        instance has the same filename then it takes its place.
+        """
+
+        if AreaVi.FILES.get(self._filename) is not self:
+            return
+
+        del AreaVi.FILES[self._filename]
+        for ind in AreaVi.AREAS:
+            if ind is not self and ind._filename == self._filename:
+                AreaVi.FILES[self._filename] = ind
+
+    def unregister(self):
+        """
+        Called on <Destroy>.
+        """
+
+        self.unregister_file()
+        AreaVi.AREAS.pop(self, None)
+
+    def redirect(self):
+        """
+        Rename the widget command then create a proc with its name 
+        so edits from both python and Tcl bindings can be tracked.
+        """
+
+        self.orig = '%s_orig' % self._w
+        self.tk.call('rename', self._w, self.orig)
+        self.tk.call('proc', self._w, 'args', EDIT_PROXY % {
+        'orig': self.orig, 'hook': self.register(self.dispatch_edit)})
+
+    def destroy(self):
+        # The chunks of a load would be inserted into a dead widget
+        # and the file of a view would be kept open.
+        self.cancel_load()
+        self.close_view()
+        Text.destroy(self)
+
+        # The proc outlives the widget command.
+        try:
+            self.tk.call('rename', self._w, '')
+        except TclError:
+            pass
+
+    def dispatch_edit(self, indexes, cmd, *args):
+        """
+        Called from the widget command proc after an edit. The indexes
+        are the ones that the edit received resolved before it happened.
+        """
+
+        indexes = [self.indexsplit(ind) 
+            for ind in self.tk.splitlist(indexes)]
+
+        try:
+            if cmd == 'insert':
+                self.on_edit(indexes[0], indexes[0], ''.join(args[1::2]))
+            elif cmd == 'replace':
+                self.on_edit(indexes[0], indexes[1], ''.join(args[2::2]))
+            else:
+                ranges = zip(indexes[::2], indexes[1::2])
+                for index0, index1 in sorted(ranges, reverse=True):
+                    self.on_edit(index0, index1, '')
+        except Exception:
+            debug()
+
+    def on_edit(self, index0, index1, data):
+        """
+        Update the line index then call the edit hooks.
+        """
+
+        index0 = self.lineindex.clamp(*index0)
+        index1 = self.lineindex.clamp(*index1)
+
+        if index1 < index0 or (index1 == index0 and not data): 
+            return
+
+        pos0 = self.lineindex.offset(*index0)
+        pos1 = self.lineindex.offset(*index1)
+        self.lineindex.replace(index0, index1, data)
+
+        for handle in self.edit_hooks:
+            handle(index0, index1, pos0, pos1, data)
+
+    def add_edit_hook(self, handle):
+        """
+        Register a function that is called after each edit of the text
+        like:
+
+        def handle(index0, index1, pos0, pos1, data):
+            pass
+
+        area.add_edit_hook(handle)
+
+        It means the text between index0 and index1 was replaced by data.
+        Both index0 and index1 are (line, col) tuples and pos0, pos1 are 
+        their char offsets, all of them taken before the edit happened. 
+        Insertions have index0 == index1 and deletions have data == ''.
+        """
+
+        self.edit_hooks.append(handle)
+
+    def offset(self, index='insert'):
+        """
+        It returns the char offset of index from '1.0' without copying
+        the text. It is like:
+
+        len(area.get('1.0', index))
+        """
+
+        return self.lineindex.offset(*self.indexref(index))
+
+    def offset_index(self, offset):
+        """
+        The opposite of AreaVi.offset, it returns the 'line.col' index
+        of a char offset.
+        """
+
+        return '%s.%s' % self.lineindex.index(offset)
+
     def settab(self, tabsize, tabchar):
         self.tabchar = tabchar
         self.tabsize = tabsize
@@ -186,21 +434,35 @@ class AreaVi(Text, DataEvent, IdleEvent):
         self.see('insert')
 
     def get_assoc_data(self, index='insert'):
-        lst = (self.db[ind] for ind in self.tag_names(index)
-        if 'ASSOC_DATA' in ind)
-        return lst
+        """
+        It returns the data that was associated to the char at index.
+        """
+
+        ids = self.assoc.find(self.offset(index))
+        return (self.assoc.get(ind)[2] for ind in ids)
+
+    def find_assoc_data(self, index0, index1):
+        """
+        It returns (index0, index1, data) for the data that was 
+        associated to ranges that overlap index0 and index1.
+        """
+
+        ids = self.assoc.find(self.offset(index0), self.offset(index1))
+        for ind in ids:
+            pos0, pos1, data = self.assoc.get(ind)
+            yield self.offset_index(pos0), self.offset_index(pos1), data
 
     def set_assoc_data(self, index0, index1, data):
         id = '(ASSOC_DATA-%s)' % self.assoc_c
-        self.tag_add(id, index0, index1)
+        self.assoc.add(id, self.offset(index0), self.offset(index1), data)
         self.assoc_c = self.assoc_c + 1
-        self.db[id]  = data
         return id
 
+    def del_assoc_data(self, id):
+        self.assoc.remove(id)
+
     def reset_assoc_data(self):
-        for ind in self.db.keys():
-            self.tag_delete(ind)
-        self.db.clear()
+        self.assoc.clear()
 
     def tags_config(self, config):
         for indi, indj in config.items():
@@ -234,6 +496,24 @@ class AreaVi(Text, DataEvent, IdleEvent):
         for indi, indj in args:
             self.tag_add(name, indi, indj)
 
+    def yview(self, *args):
+        """
+        The scrollbar of an MmapView moves over the whole file.
+        """
+
+        if self.view and args and args[0] == 'moveto':
+            return self.view.moveto(float(args[1]))
+        return Text.yview(self, *args)
+
+    def lineno(self, index='insert'):
+        """
+        The line of the file at index, it differs from the one of
+        the Text widget when the file is opened as an MmapView.
+        """
+
+        line, col = self.indexref(index)
+        return self.view.lineno(line) if self.view else line
+
     def indexref(self, index='insert'):
         """
         This is a short hand function. It is used to convert a Text index
@@ -252,11 +532,21 @@ class AreaVi(Text, DataEvent, IdleEvent):
         """
         It is used to set the cursor position at a given index using line 
         and col. 
+
+        When the file is opened as an MmapView the line is a line of 
+        the file and it is loaded if it is out of the view.
         """
 
+        if self.view:
+            line = self.view.show(int(line))
+
         self.mark_set('insert', '%s.%s' % (line, col))
         self.see('insert')
 
+        # The line may not have been loaded yet.
+        if self.loader: 
+            self.loadcur = (line, col)
+
     def indexsplit(self, index):
         """ 
         Just a shorthand for:
@@ -294,7 +584,7 @@ class AreaVi(Text, DataEvent, IdleEvent):
 
         a, b = self.indexref('(CURSOR_LAST_COL)')
         c, d = self.indexref()
-        self.setcur(c + 1, b)        
+        self.seecur('%s.%s' % (c + 1, b))
     
     def up(self):   
         """  
@@ -306,7 +596,7 @@ class AreaVi(Text, DataEvent, IdleEvent):
         if not is_start: return
         a, b = self.indexref('(CURSOR_LAST_COL)')
         c, d = self.indexref()
-        self.setcur(c - 1, b)
+        self.seecur('%s.%s' % (c - 1, b))
     
     def left(self):
         """  
@@ -488,7 +778,8 @@ class AreaVi(Text, DataEvent, IdleEvent):
                 yield indj
 
     def replace_ranges(self, name, regex, data, forwards=None, backwards=False,
-        exact=False, regexp=True, nocase=False, elide=False, nolinestop=False):
+        exact=False, regexp=True, nocase=False, elide=False, nolinestop=False, 
+        engine='tcl'):
 
         """
         It replaces all occurrences of regex in the ranges that are mapped to tag name.
@@ -503,7 +794,7 @@ class AreaVi(Text, DataEvent, IdleEvent):
             if not map: break
             self.tag_remove(name, *map)
             self.replace_all(regex, data, map[0], map[1], 
-                    exact, regexp, nocase, elide, nolinestop)
+                    exact, regexp, nocase, elide, nolinestop, engine)
 
     def select_matches(self, name, matches):
         """"
@@ -526,9 +817,11 @@ class AreaVi(Text, DataEvent, IdleEvent):
             pass
         """
 
-        index0 = index
+        # The indexes returned by find are normalized so they
+        # can be compared without calling Text.compare.
+        index0 = self.index(index)
         for chk, index1, index2 in self.find(regex, index, stopindex, *args, **kwargs):
-            if self.compare(index1, '>', index0): 
+            if self.indexsplit(index1) > self.indexsplit(index0): 
                 yield(self.get(index0, index1), index0, index1)
             index0 = index2
         else:    
@@ -536,7 +829,7 @@ class AreaVi(Text, DataEvent, IdleEvent):
     
     def find(self, regex, index='1.0', stopindex='end', forwards=None, 
         backwards=False, exact=False, regexp=True, nocase=False, elide=False, 
-        nolinestop=False, step=''):
+        nolinestop=False, step='', engine='tcl'):
 
         """
         It returns an iterator of matches. It is based on the Text.search method.
@@ -556,12 +849,29 @@ class AreaVi(Text, DataEvent, IdleEvent):
         cc7 cc8 cc9
 
         Would match cc1, cc4, cc7.
+
+        The engine parameter picks the regex engine. When it is 're' the
+        search runs python re over a snapshot of the text, see AreaVi.find_re.
         """
 
 
         if not regex: 
             raise TypeError('Regex should be non blank!')
 
+        if engine == 're':
+            for ind in self.find_re(regex, index, stopindex, backwards, 
+                exact, regexp, nocase, nolinestop, step):
+                yield ind
+            return
+
+        # The step parameter can't be expressed with search -all
+        # so it falls back to one search per match.
+        if not step:
+            for ind in self.isearch_all(regex, index, stopindex, 
+                forwards, backwards, exact, regexp, nocase, elide, nolinestop):
+                yield ind
+            return
+
         while True:
             match = self.isearch(regex, index, stopindex, 
             forwards, backwards, exact, regexp, nocase, elide=elide, 
@@ -578,6 +888,50 @@ class AreaVi(Text, DataEvent, IdleEvent):
                 index = '%s+1c' % match[2]
             yield(match)
 
+    def snapshot(self):
+        """
+        It returns a Snapshot of the whole text. See vyapp.snapshot.
+        """
+
+        return Snapshot(self.get('1.0', 'end'))
+
+    def find_re(self, regex, index='1.0', stopindex='end', backwards=False, 
+        exact=False, regexp=True, nocase=False, nolinestop=False, step=''):
+        """
+        It returns an iterator of matches like AreaVi.find but the text is
+        copied once then the pattern is matched with python re.
+
+        for match, index0, index1 in area.find_re('def [a-z_]+'):
+            pass
+
+        Note: Elided text is matched as well as any other text.
+        """
+
+        snap   = self.snapshot()
+        regex  = snap.compile(regex, exact, regexp, nocase, nolinestop)
+        pos0   = snap.offset(self.index(index))
+        pos1   = snap.offset(self.index(stopindex))
+
+        if backwards: 
+            pos0, pos1 = pos1, pos0
+
+        if not step or backwards:
+            for chunk, pos2, pos3 in snap.finditer(regex, pos0, pos1, backwards):
+                yield chunk, snap.index(pos2), snap.index(pos3)
+            return
+
+        while True:
+            match = regex.search(snap.data, pos0, pos1)
+            if not match: break
+
+            index0, index1 = snap.index(match.start()), snap.index(match.end())
+            pos0 = snap.offset(self.index('%s%s' % (index1, step)))
+
+            # Avoid an endless loop when regex matches an empty string.
+            if pos0 <= match.start(): 
+                pos0 = match.end() + 1
+            yield match.group(), index0, index1
+
     def isearch(self, pattern, *args, **kwargs):
         """
         Just search shortcut, in the sense it return the matched chunk
@@ -595,6 +949,34 @@ class AreaVi(Text, DataEvent, IdleEvent):
         pos1  = self.index('%s +%sc' % (index, len))
         return chunk, pos0, pos1
 
+    def isearch_all(self, pattern, index='1.0', stopindex='end', 
+        forwards=None, backwards=None, exact=None, regexp=None, nocase=None, 
+        elide=None, nolinestop=None):
+
+        """
+        It returns all the matches of pattern between index and stopindex
+        as a list of (chunk, index0, index1). 
+
+        The search is performed with search -all -count and the matches
+        are expanded inside the Tcl interpreter so it costs a single
+        round trip regardless of the number of matches.
+        """
+
+        opts = []
+        if forwards: opts.append('-forwards')
+        if backwards: opts.append('-backwards')
+        if exact: opts.append('-exact')
+        if regexp: opts.append('-regexp')
+        if nocase: opts.append('-nocase')
+        if elide: opts.append('-elide')
+        if nolinestop: opts.append('-nolinestop')
+
+        matches = self.tk.call('apply', SEARCH_ALL, self._w, 
+        opts, pattern, index, (stopindex, ) if stopindex else ())
+
+        return [tuple(str(indj) for indj in self.tk.splitlist(indi))
+            for indi in self.tk.splitlist(matches)]
+
     def search(self, pattern, index, stopindex='end', forwards=None,
         backwards=None, exact=None, regexp=None, nocase=None,
         count=None, elide=None, nolinestop=None):
@@ -641,6 +1023,13 @@ class AreaVi(Text, DataEvent, IdleEvent):
         stopindex=stopindex, backwards=backwards, exact=exact, regexp=regexp, 
         nocase=nocase, elide=elide, nolinestop=nolinestop)
 
+        # The match may be in a part of the file that is
+        # out of the MmapView window.
+        if not index and self.view and stopindex in ('1.0', 'end'):
+            index = self.seek_view(regex, backwards, exact, regexp, nocase)
+            index = index and self.isearch(regex, index, 'end', exact=exact, 
+            regexp=regexp, nocase=nocase, elide=elide, nolinestop=nolinestop)
+
         if not index: return
         _, start, end = index
 
@@ -651,6 +1040,21 @@ class AreaVi(Text, DataEvent, IdleEvent):
         self.tag_add(name, start, end)
         return start, end
 
+    def seek_view(self, regex, backwards, exact, regexp, nocase):
+        """
+        Search regex in the MmapView out of its window, the pattern
+        is taken as literal unless regexp is set like in isearch.
+        """
+
+        from vyapp.app import root
+        if exact or not regexp:
+            regex = re.escape(regex)
+
+        try:
+            return self.view.seek(regex, backwards, nocase)
+        except (re.error, UnicodeError) as e:
+            root.status.set_msg('Bad pattern: %s' % e)
+
     def replace(self, regex, data, index=None, stopindex=None,  
         forwards=None, backwards=None, exact=None, regexp=True, 
         nocase=None, elide=None, nolinestop=None):
@@ -693,16 +1097,29 @@ class AreaVi(Text, DataEvent, IdleEvent):
         return index, len(data)
 
     def replace_all(self, regex, data, index='1.0', stopindex='end', 
-        exact=None, regexp=True, nocase=None, elide=None, nolinestop=None):
+        exact=None, regexp=True, nocase=None, elide=None, nolinestop=None, 
+        engine='tcl', bulk=True):
 
         """
         It is used to replace all occurrences of a given match in a range.
         It accepts a callback function that determines what is replaced.
+
+        When engine is 're' the matches are found with AreaVi.find_re.
+
+        When bulk is True all the matches are found first then replaced
+        at once with AreaVi.replace_matches. Otherwise each occurrence is
+        searched and replaced with AreaVi.replace.
         """
 
         # It avoids overlapping of replacements.
         self.mark_set('(REP_STOPINDEX)', stopindex)
 
+        if bulk or engine == 're':
+            self.replace_matches(self.find(regex, index, stopindex, 
+            exact=exact, regexp=regexp, nocase=nocase, elide=elide, 
+            nolinestop=nolinestop, engine=engine), data)
+            return self.index('(REP_STOPINDEX)')
+
         while True:
             map = self.replace(regex, data, index, 
                 '(REP_STOPINDEX)', exact=exact, nocase=nocase, 
@@ -714,71 +1131,38 @@ class AreaVi(Text, DataEvent, IdleEvent):
 
             index = self.index('%s +%sc' % (index, size))
 
-    def get_paren_search_dir(self, index, start, end):
+    def replace_matches(self, matches, data):
         """
+        It replaces the ranges of the matches from either AreaVi.find or 
+        AreaVi.collect for data. When data is callable it is called 
+        with each one of the matches to compute the replacement.
 
+        All the replacements are computed upfront then applied from the
+        last match to the first one in a single call. It is undone as 
+        a single step.
         """
 
-        char  = self.get(index, '%s +1c' % index)
-        if char == start:
-            return False
-        elif char == end:
-            return True
-        else:
-            return None
-
-    def get_paren_search_sign(self, index, start, end):
-        """
-
-        """
+        edits = []
+        for chunk, index0, index1 in matches:
+            edits.append((index0, index1, data(chunk, index0, index1) 
+                if callable(data) else data))
 
-        char  = self.get(index, '%s +1c' % index)
-        if char == start:
-            return '+'
-        elif char == end:
-            return '-'
-        else:
-            return None
+        edits.reverse()
+        self.tk.call('apply', REPLACE_ALL, self._w, 
+        [indj for indi in edits for indj in indi])
 
-    def case_pair(self, index, max, start='(', end=')'):
+    def case_pair(self, index, max=None, start='(', end=')'):
         """
         Once this method is called, it returns an index for the next
-        matching parenthesis or None if the char over the cursor
+        matching parenthesis or '' if the char over the cursor
         isn't either '(' or ')'.
-        """
-
-        dir = self.get_paren_search_dir(index, start, end)
-
-        # If dir is None then there is no match.
-        if dir == None: return ''
-
-        sign  = self.get_paren_search_sign(index, start, end)
-        count = 0
-
-        # If we are searching fowards we don't need
-        # to add 1c.
-
-        index0 = '%s %s' % (index, '+1c' if dir else '')
-        size  = IntVar(0)
 
-        while True:
-            index0 = self.search('\%s|\%s' % (start, end), 
-            index = index0, stopindex = '%s %s%sc' % (index, sign, max), 
-            count = size, backwards = dir, regexp = True) 
-
-            if not index0: return ''
-
-            char  = self.get(index0, '%s +1c' % index0)
-            count = count + (1 if char == start else -1)
-
-            if not count: 
-                return index0
+        The pairs are looked up in AreaVi.brackets, when max is given
+        the matching one is searched at most max chars away.
+        """
 
-            # When we are searching backwards we don't need
-            # to set a character back because index will point
-            # to the start of the match.
-            index0 = '%s %s' % (index0, '+1c' if not dir else '')
-                
+        pos = self.brackets.pair(self.offset(index), start, end, max)
+        return '' if pos is None else self.offset_index(pos)
 
     def clear_data(self):
         """
@@ -786,6 +1170,8 @@ class AreaVi(Text, DataEvent, IdleEvent):
         """
         import os
         
+        self.cancel_load()
+        self.close_view()
         self.delete('1.0', 'end')
         self.filename = os.path.abspath(self.default_filename)
         self.event_generate('<<ClearData>>')
@@ -802,6 +1188,22 @@ class AreaVi(Text, DataEvent, IdleEvent):
         self.event_generate('<<Pre-LoadData>>')
         self.event_generate('<<Pre-LoadData/*%s>>' % self.extension)
 
+        self.cancel_load()
+        self.close_view()
+        size = os.path.getsize(self.filename)
+
+        if self.MMAP_THRESHOLD and size > self.MMAP_THRESHOLD:
+            self.view_data()
+        elif self.LOAD_THRESHOLD and size > self.LOAD_THRESHOLD:
+            self.stream_data(size)
+        else:
+            self.dump_data()
+
+    def dump_data(self):
+        """
+        It reads the whole file then inserts it at once.
+        """
+
         fd            = open(self.filename, 'rb')
         data          = fd.read()
         fd.close()
@@ -819,6 +1221,102 @@ class AreaVi(Text, DataEvent, IdleEvent):
         self.event_generate('<<LoadData>>')
         self.event_generate('<<Load/*%s>>' % self.extension)
 
+    def stream_data(self, size):
+        """
+        It reads and decodes the file incrementally then inserts
+        it in chunks from after callbacks. The AreaVi instance is 
+        read only until <<LoadData>> is generated.
+        """
+
+        from vyapp.app import root
+
+        fd      = open(self.filename, 'rb')
+        decoder = codecs.getincrementaldecoder(self.charset)()
+        count   = 0
+
+        self.delete('1.0', 'end')
+        self.mark_set('insert', '1.0')
+        self.see('insert')
+        self.configure(state='disabled')
+
+        def load_chunk():
+            nonlocal count
+            data  = fd.read(self.LOAD_CHUNK)
+            count = count + len(data)
+
+            try:
+                chunk = decoder.decode(data, not data)
+            except UnicodeDecodeError:
+                self.cancel_load()
+                self.dump_data()
+                return
+
+            self.configure(state='normal')
+            self.insert('end', chunk)
+
+            if data:
+                self.configure(state='disabled')
+                root.status.set_msg('Loading %s: %s%%' % (
+                os.path.basename(self.filename), count * 100 // max(size, 1)))
+                self.loader = self.after(1, load_chunk)
+            else:
+                self.done_load(fd)
+
+        self.loadfd = fd
+        self.loader = self.after_idle(load_chunk)
+
+    def view_data(self):
+        """
+        It opens the file as a read only MmapView. Just the lines
+        around the cursor are inserted into the AreaVi instance.
+        """
+
+        self.view = MmapView(self, self.filename)
+        self.view.load(1)
+        self.mark_set('insert', '1.0')
+        self.see('insert')
+
+        self.event_generate('<<LoadData>>')
+        self.event_generate('<<Load/*%s>>' % self.extension)
+
+    def close_view(self):
+        """
+        Close the MmapView if the file was opened as one.
+        """
+
+        if self.view:
+            self.view.close()
+        self.view = None
+
+    def done_load(self, fd):
+        """
+        Called when the last chunk was inserted by AreaVi.stream_data.
+        """
+
+        fd.close()
+        self.loader = None
+
+        if self.loadcur:
+            self.setcur(*self.loadcur)
+        self.loadcur = None
+
+        self.event_generate('<<LoadData>>')
+        self.event_generate('<<Load/*%s>>' % self.extension)
+
+    def cancel_load(self):
+        """
+        Stop a chunked load that is happening.
+        """
+
+        if not self.loader: 
+            return
+
+        self.after_cancel(self.loader)
+        self.loadfd.close()
+        self.configure(state='normal')
+        self.loader  = None
+        self.loadcur = None
+
     def decode(self, name):
         """
         Used to change the areavi encoding.
@@ -831,11 +1329,23 @@ class AreaVi(Text, DataEvent, IdleEvent):
         """
         It saves the actual text content in the current file.
         """
+        # It would save just the lines in the view.
+        if self.view:
+            from vyapp.app import root
+            root.status.set_msg('%s is a read only view!' % self.filename)
+            return
+
         _, self.extension = os.path.splitext(self.filename)
+
         self.event_generate('<<Pre-SaveData>>')
         self.event_generate('<<Pre-Save/*%s>>' % self.extension)
 
         data = self.get('1.0', 'end -1c')
+
+        if self.ASYNC_SAVE:
+            self.save_async(data)
+            return
+
         data = data.encode(self.charset)
         fd   = open(self.filename, 'wb')
         fd.write(data)
@@ -843,6 +1353,50 @@ class AreaVi(Text, DataEvent, IdleEvent):
         self.event_generate('<<SaveData>>')
         self.event_generate('<<Save/*%s>>' % self.extension)
 
+    def save_async(self, data):
+        """
+        Hand data to the Writer thread that encodes and writes it to 
+        a temporary file then replaces the file with it. <<SaveData>> 
+        is generated by AreaVi.done_save when the file is written.
+        """
+
+        if not AreaVi.WRITER:
+            AreaVi.WRITER = Writer()
+
+        AreaVi.WRITER.save(self, self.filename, 
+        data, self.charset, self.FSYNC)
+
+    def sync_data(self):
+        """
+        Wait for the Writer thread to write the queued saves, it raises
+        the error of the save of this AreaVi instance if it failed.
+        """
+
+        if not AreaVi.WRITER:
+            return
+
+        AreaVi.WRITER.wait()
+        for area, filename, error in AreaVi.WRITER.dispatch():
+            if area is self and error:
+                raise error
+
+    def done_save(self, filename, error):
+        """
+        Called by the Writer thread from tkinter mainloop 
+        when the file was written.
+        """
+
+        from vyapp.app import root
+
+        if error:
+            root.status.set_msg('Failed to save %s: %s' % (filename, error))
+            return
+
+        root.status.set_msg('File saved!')
+        _, extension = os.path.splitext(filename)
+        self.event_generate('<<SaveData>>')
+        self.event_generate('<<Save/*%s>>' % extension)
+
     def save_data_as(self, filename):
         """
         It saves the content of the given AreaVi instance into
@@ -852,7 +1406,9 @@ class AreaVi(Text, DataEvent, IdleEvent):
         filename - Name of the file to save the data.
         """
 
-        self.filename = filename
+        # The view is kept over the file it was opened from.
+        if not self.view:
+            self.filename = filename
         self.save_data()
 
 
@@ -974,14 +1530,15 @@ class AreaVi(Text, DataEvent, IdleEvent):
 
         The code above would insert 'FOO' at the end of all AreaVi widgets
         that have root as one of its master widget.
+
+        The instances come from AreaVi.AREAS so the widget tree
+        isn't walked.
         """
 
-        for ind in wid.winfo_children():
-            if isinstance(ind, AreaVi):
+        path = str(wid)
+        for ind in list(AreaVi.AREAS):
+            if path == '.' or str(ind).startswith(path + '.'):
                 yield ind
-            else:
-                for ind in AreaVi.areavi_widgets(ind):
-                    yield ind
 
     @staticmethod
     def get_opened_files(wid):
@@ -996,13 +1553,29 @@ class AreaVi(Text, DataEvent, IdleEvent):
 
         map = { '/home/tau/file.c':AreaVi_Instance,
                 '/home/tau/file.b': AreaVi_Instance}
+
+        Use AreaVi.get_area to look up a single file.
         """
 
+        if str(wid) == '.':
+            return dict(AreaVi.FILES)
+
         map = dict()
         for ind in AreaVi.areavi_widgets(wid):
             map[ind.filename] = ind
         return map
     
+    @staticmethod
+    def get_area(filename):
+        """
+        It returns the AreaVi instance that has filename opened 
+        or None.
+
+        area = AreaVi.get_area('/home/tau/file.c')
+        """
+
+        return AreaVi.FILES.get(filename)
+
     @staticmethod
     def find_all(wid, regex, index='1.0', stopindex='end', *args, **kwargs):
         """
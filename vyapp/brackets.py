@@ -0,0 +1,147 @@
+"""
+This module implements the index of the brackets of the text of AreaVi
+instances. It is built the first time a pair is looked up then kept updated
+along with the edits so matching a bracket doesn't search the text.
+"""
+
+from bisect import bisect_left
+import re
+
+class Brackets:
+    """
+    The offsets of the brackets are kept sorted in a list with a gap,
+    the offsets from the gap on are stored without the shift of the
+    last edits. Edits that happen close to each other only move the gap
+    a bit so typing doesn't touch the whole list.
+    """
+
+    regex = re.compile(r'[][(){}]')
+
+    def __init__(self, area):
+        self.area  = area
+        self.ready = False
+        self.offs  = []
+        self.chars = []
+        self.gap   = 0
+        self.delta = 0
+
+        # The pairs that were looked up, offset -> offset, and the
+        # (offset, max) of the lookups that had no match, they are
+        # kept until the next edit.
+        self.pairs  = {}
+        self.misses = set()
+
+    def build(self):
+        data       = self.area.get('1.0', 'end')
+        matches    = list(self.regex.finditer(data))
+        self.offs  = [ind.start() for ind in matches]
+        self.chars = [ind.group() for ind in matches]
+        self.gap   = len(self.offs)
+        self.delta = 0
+        self.pairs.clear()
+        self.misses.clear()
+        self.ready = True
+
+    def offset(self, k):
+        """
+        The offset of the bracket k.
+        """
+
+        return self.offs[k] + self.delta if k >= self.gap else self.offs[k]
+
+    def find(self, pos):
+        """
+        The position of the first bracket whose offset is not lower than pos.
+        """
+
+        k = bisect_left(self.offs, pos, 0, self.gap)
+        if k < self.gap:
+            return k
+        return bisect_left(self.offs, pos - self.delta, self.gap)
+
+    def move_gap(self, k):
+        offs, delta = self.offs, self.delta
+        for ind in range(self.gap, k):
+            offs[ind] = offs[ind] + delta
+        for ind in range(k, self.gap):
+            offs[ind] = offs[ind] - delta
+        self.gap = k
+
+    def update(self, pos0, pos1, data):
+        """
+        Called when the chars from pos0 to pos1 were replaced by data.
+        """
+
+        if not self.ready:
+            return
+
+        self.misses.clear()
+        k0, k1 = self.find(pos0), self.find(pos1)
+        self.move_gap(k1)
+        self.delta = self.delta + len(data) - (pos1 - pos0)
+
+        matches = list(self.regex.finditer(data))
+        self.offs[k0:k1]  = [pos0 + ind.start() for ind in matches]
+        self.chars[k0:k1] = [ind.group() for ind in matches]
+        self.gap = k0 + len(matches)
+
+        # The pairs that have one bracket in the edited range or
+        # that contain it may have changed.
+        if self.pairs:
+            self.pairs = self.shift_pairs(pos0, pos1, len(data))
+
+    def shift_pairs(self, pos0, pos1, size):
+        pairs = {}
+        delta = size - (pos1 - pos0)
+        for indi, indj in self.pairs.items():
+            if indi < pos0 and indj < pos0:
+                pairs[indi] = indj
+            elif indi >= pos1 and indj >= pos1:
+                pairs[indi + delta] = indj + delta
+        return pairs
+
+    def pair(self, pos, start, end, max=None):
+        """
+        It returns the offset of the bracket that matches the one at pos
+        or None. Only start and end brackets are taken into account,
+        when max is given the match is looked up at most max chars away.
+        """
+
+        if not self.ready:
+            self.build()
+
+        k = self.find(pos)
+        if k >= len(self.offs) or self.offset(k) != pos:
+            return None
+
+        char = self.chars[k]
+        if char in (start, end) and pos in self.pairs:
+            match = self.pairs[pos]
+            return match if max is None or abs(match - pos) <= max else None
+        elif (pos, max) in self.misses:
+            return None
+        elif char == start:
+            stop = len(self.offs) if max is None else self.find(pos + max + 1)
+            seq  = range(k, stop)
+        elif char == end:
+            stop = -1 if max is None else self.find(pos - max) - 1
+            seq, start, end = range(k, stop, -1), end, start
+        else:
+            return None
+
+        count = 0
+        for ind in seq:
+            char = self.chars[ind]
+            if char == start:
+                count = count + 1
+            elif char == end:
+                count = count - 1
+                if not count:
+                    break
+        else:
+            self.misses.add((pos, max))
+            return None
+
+        match = self.offset(ind)
+        self.pairs[pos], self.pairs[match] = match, pos
+        return match
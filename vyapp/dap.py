@@ -89,8 +89,7 @@ class DAP:
         """
         filename = abspath(filename)
 
-        wids = AreaVi.get_opened_files(root)
-        area = wids.get(filename)
+        area = AreaVi.get_area(filename)
 
         if area: root.note.set_line(area, line)
         area.tag_delete('(DebuggerBP)')
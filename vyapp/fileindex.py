@@ -0,0 +1,280 @@
+"""
+This module implements the tables of the files of folders that fsniffer
+and fsearch rank as the pattern is typed.
+
+A FileIndex keeps the names of the files of each folder, hidden files
+and the ones that match the patterns of .gitignore, .ignore and .agignore
+are left out like in the searches. The folders that changed are read
+again before the files are ranked, on linux inotify tells which ones
+changed. When it isn't available the mtimes of the folders are
+compared, they change when files are created, removed or renamed.
+They are compared at most every FileIndex.interval seconds.
+"""
+
+from threading import Thread, Lock
+from vyapp.grep import read_rules, is_ignored
+from heapq import nsmallest
+from time import monotonic
+import ctypes
+import struct
+import re
+import os
+
+# Events of the folders that change their lists of files.
+IN_MOVED_FROM  = 0x40
+IN_MOVED_TO    = 0x80
+IN_CREATE      = 0x100
+IN_DELETE      = 0x200
+IN_DELETE_SELF = 0x400
+IN_Q_OVERFLOW  = 0x4000
+IN_ONLYDIR     = 0x1000000
+
+MASK = IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE \
+    | IN_DELETE_SELF | IN_ONLYDIR
+
+EVENT = struct.Struct('iIII')
+
+# The tables that were built by folders.
+INDEXES = {}
+
+class Inotify:
+    """
+    A ctypes wrapper around the inotify calls of libc, it raises
+    OSError when they aren't available.
+    """
+
+    def __init__(self):
+        try:
+            self.libc = ctypes.CDLL(None, use_errno=True)
+            self.fd   = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError, TypeError) as e:
+            raise OSError(str(e))
+
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.wds = {}
+
+    def add(self, path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_add_watch failed')
+        self.wds[wd] = path
+
+    def read(self):
+        """
+        It returns the folders that changed since the last call, it
+        returns None when the queue overflowed.
+        """
+
+        dirs = set()
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return dirs
+
+            pos = 0
+            while pos < len(data):
+                wd, mask, cookie, size = EVENT.unpack_from(data, pos)
+                pos = pos + EVENT.size + size
+                if mask & IN_Q_OVERFLOW:
+                    return None
+                if wd in self.wds:
+                    dirs.add(self.wds[wd])
+
+    def close(self):
+        os.close(self.fd)
+
+class FileIndex:
+    """
+    The table of the files of dirs, it is built in a thread.
+    """
+
+    # Seconds between the checks of the mtimes of the folders
+    # when inotify isn't available.
+    interval = 2
+
+    def __init__(self, dirs):
+        self.dirs    = dirs
+        self.lock    = Lock()
+        self.names   = {}
+        self.subdirs = {}
+        self.rules   = {}
+        self.mtimes  = {}
+        self.table   = None
+        self.checked = 0
+
+        try:
+            self.inotify = Inotify()
+        except OSError:
+            self.inotify = None
+
+        self.thread = Thread(target=self.build, daemon=True)
+        self.thread.start()
+
+    @property
+    def ready(self):
+        return not self.thread.is_alive()
+
+    def build(self):
+        with self.lock:
+            for ind in self.dirs:
+                self.scan(os.path.abspath(ind), [])
+            self.checked = monotonic()
+
+    def scan(self, dir, rules):
+        """
+        Read the folder dir and the new folders in it, the tree is
+        walked with a stack so deep trees don't hit the recursion limit.
+        """
+
+        stack = [(dir, rules)]
+        while stack:
+            stack.extend(self.read(*stack.pop()))
+
+    def read(self, dir, rules):
+        """
+        Read the folder dir, it returns (path, rules) for the folders
+        in it that weren't read yet.
+        """
+
+        try:
+            mtime   = os.stat(dir).st_mtime_ns
+            entries = list(os.scandir(dir))
+        except OSError:
+            self.drop(dir)
+            return []
+
+        if self.inotify and dir not in self.mtimes:
+            try:
+                self.inotify.add(dir)
+            except OSError:
+                self.inotify.close()
+                self.inotify = None
+
+        # The rules of the folder are kept without the ones of its
+        # ignore files, they are read again when it changes.
+        self.rules[dir] = rules
+        rules = rules + read_rules(dir)
+        names, subdirs = [], []
+
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            try:
+                isdir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if not is_ignored(rules, entry, isdir):
+                (subdirs if isdir else names).append(entry.name)
+
+        for ind in set(self.subdirs.get(dir, ())) - set(subdirs):
+            self.drop(os.path.join(dir, ind))
+
+        self.mtimes[dir]  = mtime
+        self.names[dir]   = names
+        self.subdirs[dir] = subdirs
+        self.table        = None
+
+        paths = (os.path.join(dir, ind) for ind in subdirs)
+        return [(ind, rules) for ind in paths if ind not in self.mtimes]
+
+    def drop(self, dir):
+        stack = [dir]
+        while stack:
+            dir = stack.pop()
+            stack.extend(os.path.join(dir, ind)
+                for ind in self.subdirs.pop(dir, ()))
+
+            self.names.pop(dir, None)
+            self.rules.pop(dir, None)
+            self.mtimes.pop(dir, None)
+        self.table = None
+
+    def refresh(self):
+        """
+        Read again the folders whose files changed.
+        """
+
+        if self.inotify:
+            dirs = self.inotify.read()
+        else:
+            dirs = set()
+        if dirs is None or not self.inotify:
+            if monotonic() - self.checked < self.interval:
+                return
+            dirs = [ind for ind, mtime in self.mtimes.items()
+                if self.changed(ind, mtime)]
+            self.checked = monotonic()
+
+        for ind in dirs:
+            if ind in self.mtimes:
+                self.scan(ind, self.rules[ind])
+
+    def changed(self, dir, mtime):
+        try:
+            return os.stat(dir).st_mtime_ns != mtime
+        except OSError:
+            return True
+
+    def get_table(self):
+        """
+        It returns a list of (path, lower, isdir) for the files and
+        the folders.
+        """
+
+        with self.lock:
+            self.refresh()
+            if self.table is None:
+                table = [(ind, ind.lower(), True) for ind in self.names]
+                for dir, names in self.names.items():
+                    table.extend((path, path.lower(), False) for path in
+                        (os.path.join(dir, ind) for ind in names))
+                self.table = table
+            return self.table
+
+    def rank(self, pattern, limit=200, dirs=False):
+        """
+        The paths that have the chars of pattern in order, the best
+        limit ones first. The ones whose names have the chars come
+        first then the ones with the chars closer to each other
+        then the shorter ones.
+        """
+
+        table = self.get_table()
+        # Each char matches the first one after the previous char
+        # so a failing search doesn't backtrack much.
+        chars = [re.escape(ind) for ind in pattern.replace(' ', '').lower()]
+        regex = re.compile(''.join(chars[:1] + ['[^%s]*%s' % (ind, ind)
+            for ind in chars[1:]]))
+        hits  = []
+
+        for path, lower, isdir in table:
+            if isdir and not dirs:
+                continue
+            match = regex.search(lower)
+            if not match:
+                continue
+
+            name = lower.rfind(os.sep) + 1
+            if match.start() < name:
+                named = regex.search(lower, name)
+                match = named or match
+            else:
+                named = match
+            hits.append((named is None, match.end() - match.start(),
+                len(path), path))
+
+        return [ind[-1] for ind in nsmallest(limit, hits)]
+
+def get_index(dirs):
+    """
+    The FileIndex of dirs, it starts being built in a thread
+    the first time.
+    """
+
+    dirs  = tuple(dirs)
+    index = INDEXES.get(dirs)
+    if index is None:
+        index = INDEXES[dirs] = FileIndex(dirs)
+    return index
@@ -0,0 +1,386 @@
+"""
+This module implements the searches that Sniper and Fstmt do over
+files. They run in a thread and the hits are handed to tkinter mainloop
+in batches so they show up while the search is going on.
+
+When ag isn't installed the files are searched in process, they are
+walked with os.scandir then mapped and searched with re in a pool
+of processes.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from multiprocessing import get_context, get_all_start_methods
+from subprocess import Popen, PIPE, STDOUT
+from threading import Thread, Lock
+from traceback import print_exc as debug
+from fnmatch import translate
+from itertools import islice
+from shutil import which
+import mmap
+import re
+import os
+
+# The lines of ag --vimgrep output, filename:line:col:text.
+REGEX = re.compile('(.+):([0-9]+):[0-9]+:(.+)')
+
+# Files whose patterns of files to skip are used like ag does.
+IGNORE_FILES = ('.gitignore', '.ignore', '.agignore')
+
+# Folder where the trigram indexes are kept, None when
+# they aren't used, see Sniper.c_index.
+INDEX = None
+
+# Folders of the wide searches of Sniper and fsniffer,
+# see Sniper.c_dirs.
+DIRS = ()
+
+# The processes are started by a fork server or spawned, forking the
+# process of tkinter from the search thread could deadlock. They import
+# the vy script as a module, it runs the editor only as the main one.
+CONTEXT = get_context('forkserver' if 'forkserver' 
+    in get_all_start_methods() else 'spawn')
+
+class Grep(Thread):
+    """
+    It calls handle(hits) from tkinter mainloop with the hits that were
+    found since the last call, hits is a list of (filename, line, text).
+    Then done(count) is called when the search is over.
+    """
+
+    # Interval in ms to hand the hits to mainloop.
+    timeout = 50
+
+    def __init__(self, widget, handle, done):
+        Thread.__init__(self, daemon=True)
+        self.widget  = widget
+        self.handle  = handle
+        self.done    = done
+        self.lock    = Lock()
+        self.hits    = []
+        self.count   = 0
+        self.stopped = False
+
+        self.funcid  = widget.after(self.timeout, self.poll)
+        self.start()
+
+    def run(self):
+        try:
+            self.search()
+        except Exception:
+            if not self.stopped:
+                debug()
+
+    def search(self):
+        pass
+
+    def put(self, hits):
+        with self.lock:
+            self.hits.extend(hits)
+
+    def poll(self):
+        # The hits are all there once the thread is over.
+        alive = self.is_alive()
+        with self.lock:
+            hits, self.hits = self.hits, []
+
+        try:
+            if hits:
+                self.count = self.count + len(hits)
+                self.handle(hits)
+            if not alive:
+                self.done(self.count)
+        except Exception:
+            debug()
+
+        self.funcid = self.widget.after(self.timeout,
+        self.poll) if alive else None
+
+    def cancel(self):
+        """
+        Stop the search, the hits that weren't handled are dropped.
+        """
+
+        self.stopped = True
+        if self.funcid:
+            self.widget.after_cancel(self.funcid)
+        self.funcid = None
+
+class Ag(Grep):
+    """
+    Run the ag command cmd and parse its output as it is written.
+    """
+
+    def __init__(self, widget, cmd, charset, handle, done):
+        self.child = Popen(cmd, stdout=PIPE, stderr=STDOUT,
+        encoding=charset, errors='replace')
+        Grep.__init__(self, widget, handle, done)
+
+    def search(self):
+        try:
+            for line in self.child.stdout:
+                match = REGEX.match(line)
+                if match:
+                    self.put([match.groups()])
+        finally:
+            self.child.stdout.close()
+            self.child.wait()
+
+    def cancel(self):
+        Grep.cancel(self)
+        try:
+            self.child.kill()
+        except OSError:
+            pass
+
+class Scan(Grep):
+    """
+    Search the files of dirs in process, the arguments are
+    the ones of scan.
+    """
+
+    def __init__(self, widget, handle, done, *args, **kwargs):
+        self.args   = args
+        self.kwargs = kwargs
+        Grep.__init__(self, widget, handle, done)
+
+    def search(self):
+        for hits in scan(*self.args, stopped=lambda: self.stopped,
+            **self.kwargs):
+            self.put(hits)
+
+def search(widget, cmd, charset, handle, done):
+    """
+    Run the ag command cmd or search the files in process with
+    the same options when ag isn't installed or the trigram
+    indexes are used.
+    """
+
+    if which(cmd[0]) and not INDEX:
+        return Ag(widget, cmd, charset, handle, done)
+    pattern, dirs, kwargs = parse_cmd(cmd)
+    return Scan(widget, handle, done, dirs, pattern, charset, **kwargs)
+
+def parse_cmd(cmd):
+    """
+    It returns (pattern, dirs, options) for the ag commands that
+    Sniper and Fstmt build, options are the ones of scan. When
+    there are no dirs the current folder is searched like ag does.
+
+    The options end at the pattern or at --, the pattern may start
+    with a dash after them or after -Q.
+    """
+
+    args = iter(cmd[1:])
+    opts = {'ignore': [], 'file_regex': '', 'nocase': None,
+        'literal': False, 'multiline': True}
+    rest = []
+
+    for ind in args:
+        if ind == '--ignore':
+            opts['ignore'].append(next(args))
+        elif ind == '-G':
+            opts['file_regex'] = next(args)
+        elif ind in ('-s', '-i'):
+            opts['nocase'] = ind == '-i'
+        elif ind == '-Q':
+            opts['literal'] = True
+            ind = next(args)
+            rest.append(next(args) if ind == '--' else ind)
+            break
+        elif ind == '--':
+            break
+        elif ind in ('--multiline', '--nomultiline'):
+            opts['multiline'] = ind == '--multiline'
+        elif not ind.startswith('-'):
+            rest.append(ind)
+            break
+
+    rest.extend(args)
+    dirs = [ind for ind in rest[1:] if ind]
+    return rest[0], dirs or [os.getcwd()], opts
+
+def compile_rule(base, rule):
+    """
+    It returns (base, regex, dironly) for a pattern of an ignore file
+    in the folder base. Patterns with a slash are matched against the
+    path from base, the other ones against the names.
+    """
+
+    dironly = rule.endswith('/')
+    rule    = rule.rstrip('/')
+    regex   = re.compile(translate(rule.lstrip('/')))
+    return (base if '/' in rule else None, regex, dironly)
+
+def read_rules(path):
+    rules = []
+    for name in IGNORE_FILES:
+        try:
+            with open(os.path.join(path, name), errors='replace') as fd:
+                lines = [ind.strip() for ind in fd]
+        except OSError:
+            continue
+
+        # Negated patterns aren't supported, they are left out.
+        rules.extend(compile_rule(path, ind) for ind in lines
+            if ind and not ind.startswith(('#', '!')))
+    return rules
+
+def is_ignored(rules, entry, isdir):
+    for base, regex, dironly in rules:
+        if dironly and not isdir:
+            continue
+        name = entry.name if base is None else os.path.relpath(entry.path, base)
+        if regex.match(name):
+            return True
+    return False
+
+def walk(dirs, ignore=(), file_regex=''):
+    """
+    It yields the files of dirs that aren't hidden nor match the ignore
+    patterns or the ones of the ignore files in the folders. When
+    file_regex is given only the files that match it are yielded.
+    """
+
+    rules = [compile_rule(None, ind) for ind in ignore]
+    regex = re.compile(file_regex) if file_regex else None
+    stack = [(os.path.abspath(ind), rules) for ind in reversed(dirs)]
+    seen  = set()
+
+    while stack:
+        path, rules = stack.pop()
+        if os.path.isfile(path):
+            yield path
+            continue
+
+        # The dirs may contain each other.
+        if path in seen:
+            continue
+        seen.add(path)
+
+        try:
+            entries = list(os.scandir(path))
+        except OSError:
+            continue
+
+        rules = rules + read_rules(path)
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+
+            try:
+                isdir  = entry.is_dir(follow_symlinks=False)
+                isfile = entry.is_file(follow_symlinks=False)
+            except OSError:
+                continue
+
+            if is_ignored(rules, entry, isdir):
+                continue
+            if isdir:
+                stack.append((entry.path, rules))
+            elif isfile and (not regex or regex.search(entry.path)):
+                yield entry.path
+
+def search_files(paths, pattern, flags, charset, multiline=True):
+    """
+    It returns the hits of the bytes regex pattern in the files as
+    (filename, line, text), files with a null byte in the first 8k
+    are taken as binary and skipped.
+    """
+
+    regex = re.compile(pattern, flags)
+    hits  = []
+
+    for path in paths:
+        try:
+            with open(path, 'rb') as fd:
+                if not os.fstat(fd.fileno()).st_size:
+                    continue
+                with mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    if data.find(b'\0', 0, 8192) == -1:
+                        hits.extend(search_data(path, data,
+                            regex, charset, multiline))
+        except (OSError, ValueError):
+            continue
+    return hits
+
+def search_data(path, data, regex, charset, multiline):
+    line, last = 1, 0
+    for match in regex.finditer(data):
+        start, end = match.span()
+        if start == end or not multiline \
+            and data.find(b'\n', start, end) != -1:
+            continue
+
+        line = line + data[last:start].count(b'\n')
+        last = start
+        lend = data.find(b'\n', start)
+        text = data[data.rfind(b'\n', 0, start) + 1:
+            lend if lend != -1 else len(data)]
+        yield path, str(line), text.decode(charset, 'replace')
+
+def scan(dirs, pattern, charset='utf-8', ignore=(), file_regex='',
+    nocase=None, literal=False, multiline=True, workers=None,
+    chunk=64, stopped=lambda: False):
+    """
+    It yields lists of the hits of pattern in the files of dirs as they
+    are found. The files are searched in chunks across a pool of
+    workers processes, see imap. When nocase is None the search is
+    case insensitive only if the pattern has no upper case chars.
+
+    When INDEX is set only the files that the trigram indexes
+    tell may match are searched.
+    """
+
+    if literal:
+        pattern = re.escape(pattern)
+    if nocase is None:
+        nocase = pattern == pattern.lower()
+
+    flags = re.MULTILINE | re.IGNORECASE if nocase else re.MULTILINE
+    args  = (pattern.encode(charset), flags, charset, multiline)
+
+    if INDEX:
+        # The trigram module imports this one.
+        from vyapp.trigram import narrow
+        files = narrow(INDEX, dirs, pattern, flags, charset, ignore,
+            file_regex, workers, stopped)
+    else:
+        files = walk(dirs, ignore, file_regex)
+
+    chunks = iter(lambda: list(islice(files, chunk)), [])
+    yield from imap(search_files, chunks, args, workers, stopped)
+
+def imap(func, chunks, args=(), workers=None, stopped=lambda: False):
+    """
+    It yields func(chunk, *args) for the chunks as they are done, they
+    are run across a pool of workers processes, by default one for
+    each cpu. The chunks are consumed as the pool gets free.
+    """
+
+    # A pool of one process would only add the pickling.
+    workers = workers or os.cpu_count() or 1
+    if workers < 2:
+        for ind in chunks:
+            if stopped():
+                return
+            yield func(ind, *args)
+        return
+
+    pool    = ProcessPoolExecutor(workers, mp_context=CONTEXT)
+    pending = set()
+
+    try:
+        for ind in chunks:
+            if stopped():
+                return
+            pending.add(pool.submit(func, ind, *args))
+
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                yield from (ind.result() for ind in done)
+
+        while pending and not stopped():
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            yield from (ind.result() for ind in done)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,250 @@
+"""
+This module implements the store of the data that is associated to
+ranges of text of AreaVi instances. The ranges are kept as char offsets
+that are shifted along with the edits of the text so no Tk tags
+are needed.
+"""
+
+from bisect import bisect_left
+
+# The end of the leaves that hold no interval.
+EMPTY = float('-inf')
+
+class Intervals:
+    """
+    The intervals are kept sorted by start in a static tree whose nodes
+    hold the max end of their subtree, it is rebuilt when a query
+    happens after intervals were added.
+
+    The edits don't change the order of the intervals so they are
+    applied to the tree. Like Brackets the intervals from gap on are
+    stored without the shift of the last edits, an edit only touches
+    the intervals between it and the previous one and the ones that
+    contain it. The removed ones are left in the tree as empty leaves.
+    """
+
+    def __init__(self):
+        # The entries are id -> [start, end, data, count, k], the count
+        # is used to sort the query results by insertion order and k is
+        # the leaf of the interval.
+        self.entries = {}
+        self.count   = 0
+        self.dirty   = False
+
+        self.starts  = []
+        self.ids     = []
+        self.tree    = []
+        self.size    = 0
+        self.gap     = 0
+        self.delta   = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, id, start, end, data):
+        """
+        Associate data to the chars from offset start to end, the
+        tree is rebuilt once when the next query happens.
+        """
+
+        self.remove(id)
+        self.settle()
+        self.entries[id] = [start, end, data, self.count, None]
+        self.count = self.count + 1
+        self.dirty = True
+
+    def remove(self, id):
+        entry = self.entries.pop(id, None)
+        if entry is None or self.dirty:
+            return
+
+        self.ids[entry[4]] = None
+        self.set_end(entry[4], EMPTY)
+        if len(self.ids) > 2 * len(self.entries) + 64:
+            self.settle()
+            self.dirty = True
+
+    def clear(self):
+        self.entries.clear()
+        self.build()
+        self.dirty = False
+
+    def settle(self):
+        """
+        Apply the shift of the last edits to the intervals
+        from gap on.
+        """
+
+        if self.delta:
+            self.move_gap(len(self.ids))
+        self.delta = 0
+
+    def shift(self, pos0, pos1, size):
+        """
+        Called when the chars from pos0 to pos1 were replaced by size
+        chars. Intervals behave like Tk tags, they grow when text is
+        inserted in the middle of them but not at their edges, and
+        are dropped when all of their chars are deleted.
+        """
+
+        if self.dirty:
+            self.shift_all(pos0, pos1, size)
+            return
+
+        k0, k1 = self.index(pos0), self.index(pos1)
+        self.move_gap(k1)
+        delta = size - (pos1 - pos0)
+        self.delta = self.delta + delta
+
+        # The ones that contain pos0 and the ones that start
+        # in the edited range.
+        ids = []
+        self.collect(1, 0, k0, pos0, ids)
+        ids.extend(self.ids[ind] for ind in range(k0, k1)
+            if self.ids[ind] is not None)
+        for ind in range(k0, k1):
+            self.starts[ind] = pos0 + size
+
+        for id in ids:
+            entry = self.entries[id]
+            start, end, k = entry[0], entry[1], entry[4]
+            if start >= pos0:
+                start = pos0 + size
+            end = end + delta if end > pos1 else pos0
+
+            if end > start:
+                entry[0] = start
+                self.set_end(k, end)
+            else:
+                self.remove(id)
+
+    def shift_all(self, pos0, pos1, size):
+        delta = size - (pos1 - pos0)
+        for id, entry in list(self.entries.items()):
+            start, end = entry[0], entry[1]
+            if end <= pos0:
+                continue
+
+            if start >= pos0:
+                start = start + delta if start >= pos1 else pos0 + size
+            end = end + delta if end > pos1 else pos0
+
+            if end > start:
+                entry[0], entry[1] = start, end
+            else:
+                del self.entries[id]
+
+    def index(self, pos):
+        """
+        The leaf of the first interval whose start is not lower than pos.
+        """
+
+        k = bisect_left(self.starts, pos, 0, self.gap)
+        if k < self.gap:
+            return k
+        return bisect_left(self.starts, pos - self.delta, self.gap)
+
+    def move_gap(self, k):
+        delta = self.delta
+        for ind in range(self.gap, k):
+            self.move(ind, delta)
+        for ind in range(k, self.gap):
+            self.move(ind, -delta)
+        self.gap = k
+
+    def move(self, k, delta):
+        self.starts[k] = self.starts[k] + delta
+        if self.ids[k] is not None:
+            entry = self.entries[self.ids[k]]
+            entry[0] = entry[0] + delta
+            self.set_end(k, entry[1] + delta)
+
+    def set_end(self, k, end):
+        """
+        Set the end of the leaf k and of the entry then update
+        the max ends of the nodes above it.
+        """
+
+        if self.ids[k] is not None:
+            self.entries[self.ids[k]][1] = end
+
+        node = self.size + k
+        tree = self.tree
+        tree[node] = end
+        node = node >> 1
+        while node:
+            tree[node] = max(tree[2 * node], tree[2 * node + 1])
+            node = node >> 1
+
+    def update(self):
+        if self.dirty:
+            self.build()
+            self.dirty = False
+
+    def build(self):
+        items       = sorted(self.entries.items(), key=lambda item: item[1][0])
+        self.ids    = [id for id, entry in items]
+        self.starts = [entry[0] for id, entry in items]
+        self.size   = 1 << max(len(items) - 1, 0).bit_length()
+        self.tree   = [EMPTY] * (2 * self.size)
+        self.gap    = len(items)
+        self.delta  = 0
+
+        for ind, (id, entry) in enumerate(items):
+            self.tree[self.size + ind] = entry[1]
+            entry[4] = ind
+        for ind in range(self.size - 1, 0, -1):
+            self.tree[ind] = max(self.tree[2 * ind], self.tree[2 * ind + 1])
+
+    def collect(self, node, lower, upper, pos, ids):
+        """
+        Walk the nodes that cover positions below upper and whose
+        max end is greater than pos. The nodes that have leaves
+        on both sides of the gap are always walked.
+        """
+
+        if lower >= upper:
+            return
+
+        span = self.size >> (node.bit_length() - 1)
+        end  = self.tree[node]
+        if lower >= self.gap:
+            end = end + self.delta
+        elif lower + span > self.gap:
+            end = pos + 1
+
+        if end <= pos:
+            return
+
+        if node >= self.size:
+            ids.append(self.ids[node - self.size])
+            return
+
+        mid = lower + (span >> 1)
+        self.collect(2 * node, lower, min(upper, mid), pos, ids)
+        self.collect(2 * node + 1, mid, upper, pos, ids)
+
+    def find(self, pos0, pos1=None):
+        """
+        It returns the ids of the intervals that contain the offset
+        pos0 or that overlap the range from pos0 to pos1.
+        """
+
+        self.update()
+        pos1  = pos0 + 1 if pos1 is None else max(pos1, pos0 + 1)
+        upper = self.index(pos1)
+        ids   = []
+
+        self.collect(1, 0, upper, pos0, ids)
+        ids.sort(key=lambda id: self.entries[id][3])
+        return ids
+
+    def get(self, id):
+        """
+        It returns (start, end, data) for id.
+        """
+
+        start, end, data, count, k = self.entries[id]
+        if self.delta and k >= self.gap:
+            return (start + self.delta, end + self.delta, data)
+        return (start, end, data)
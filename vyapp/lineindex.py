@@ -0,0 +1,189 @@
+"""
+This module implements the index of line offsets that AreaVi instances
+keep updated along with the edits of their text. It is used to convert
+between char offsets and Text indexes without copying the text.
+"""
+
+class Fenwick:
+    """
+    A Fenwick tree over a list of non negative integers.
+    """
+
+    def __init__(self, values):
+        self.size = len(values)
+        self.tree = [0] + list(values)
+
+        for ind in range(1, self.size + 1):
+            parent = ind + (ind & -ind)
+            if parent <= self.size:
+                self.tree[parent] = self.tree[parent] + self.tree[ind]
+
+    def add(self, index, delta):
+        """
+        Add delta to the value at index.
+        """
+
+        index = index + 1
+        while index <= self.size:
+            self.tree[index] = self.tree[index] + delta
+            index = index + (index & -index)
+
+    def prefix(self, index):
+        """
+        The sum of the values before index.
+        """
+
+        total = 0
+        while index > 0:
+            total = total + self.tree[index]
+            index = index - (index & -index)
+        return total
+
+    def search(self, value):
+        """
+        It returns the index of the value that contains the
+        position value and the sum of the values before it.
+        """
+
+        pos, rem = 0, value
+        step     = 1 << self.size.bit_length()
+
+        while step:
+            nxt = pos + step
+            if nxt <= self.size and self.tree[nxt] <= rem:
+                pos, rem = nxt, rem - self.tree[nxt]
+            step = step >> 1
+        return pos, value - rem
+
+class LineIndex:
+    """
+    It holds the length of each one of the lines of a Text widget,
+    the newline included. The lengths are split in blocks, Fenwick
+    trees over the block sizes locate a line or an offset in O(log n)
+    then the block is walked.
+    """
+
+    # Blocks are split when they get twice as big.
+    size = 512
+
+    def __init__(self):
+        # An empty Text widget still has the last newline.
+        self.blocks = [[1]]
+        self.build()
+
+    def build(self):
+        """
+        Rebuild the trees after the blocks were split or merged.
+        """
+
+        self.nlines = Fenwick([len(ind) for ind in self.blocks])
+        self.nchars = Fenwick([sum(ind) for ind in self.blocks])
+
+    def count(self):
+        """
+        The number of lines.
+        """
+
+        return self.nlines.prefix(len(self.blocks))
+
+    def locate(self, line):
+        """
+        The block of a line and its position in the block.
+        """
+
+        block, lines = self.nlines.search(line - 1)
+        block = min(block, len(self.blocks) - 1)
+        return block, line - 1 - self.nlines.prefix(block)
+
+    def length(self, line):
+        """
+        The length of line including its newline.
+        """
+
+        block, pos = self.locate(line)
+        return self.blocks[block][pos]
+
+    def clamp(self, line, col):
+        """
+        Indexes after the last newline map to it. Text widgets insert
+        before it and never delete it.
+        """
+
+        count = self.count()
+        if line > count:
+            return count, self.length(count) - 1
+        return line, col
+
+    def offset(self, line, col):
+        """
+        Convert a line and col into a char offset.
+        """
+
+        block, pos = self.locate(line)
+        return (self.nchars.prefix(block)
+            + sum(self.blocks[block][:pos]) + col)
+
+    def index(self, offset):
+        """
+        Convert a char offset into a line and col.
+        """
+
+        block, chars = self.nchars.search(offset)
+        block = min(block, len(self.blocks) - 1)
+        line  = self.nlines.prefix(block) + 1
+        col   = offset - chars
+
+        for ind in self.blocks[block][:-1]:
+            if col < ind: break
+            line, col = line + 1, col - ind
+        return line, col
+
+    def replace(self, index0, index1, data):
+        """
+        Update the lengths when the text between index0 and index1
+        is replaced by data. Both indexes are (line, col) before the edit.
+        """
+
+        (line0, col0), (line1, col1) = index0, index1
+        tail  = self.length(line1) - col1
+        parts = data.split('\n')
+
+        if len(parts) == 1:
+            lens = [col0 + len(data) + tail]
+        else:
+            lens = [col0 + len(parts[0]) + 1]
+            lens.extend(len(ind) + 1 for ind in parts[1:-1])
+            lens.append(len(parts[-1]) + tail)
+        self.splice(line0, line1, lens)
+
+    def splice(self, line0, line1, lens):
+        """
+        Replace the lengths of the lines from line0 to line1 by lens.
+        """
+
+        block0, pos0 = self.locate(line0)
+        block1, pos1 = self.locate(line1)
+
+        if block0 == block1:
+            block  = self.blocks[block0]
+            lines  = len(lens) - (pos1 - pos0 + 1)
+            chars  = sum(lens) - sum(block[pos0:pos1 + 1])
+            block[pos0:pos1 + 1] = lens
+
+            if len(block) <= 2 * self.size and block:
+                self.nlines.add(block0, lines)
+                self.nchars.add(block0, chars)
+                return
+        else:
+            self.blocks[block0] = (self.blocks[block0][:pos0]
+                + lens + self.blocks[block1][pos1 + 1:])
+            del self.blocks[block0 + 1:block1 + 1]
+
+        block = self.blocks[block0]
+        self.blocks[block0:block0 + 1] = [block[ind:ind + self.size]
+            for ind in range(0, len(block), self.size)]
+
+        if not self.blocks:
+            self.blocks.append([1])
+        self.build()
+
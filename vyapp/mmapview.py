@@ -0,0 +1,262 @@
+"""
+This module implements a read only view for files that are too big
+to be held by a Text widget. The file is memory mapped and only a window
+of lines around the position being viewed is inserted into the AreaVi
+instance. The window is moved when the view is scrolled near its edges
+or when the cursor is set at a line that is out of it.
+
+The scrollbar and the line in the status bar show positions in the
+file, the undo of the AreaVi instance is off while it is a view.
+"""
+
+from itertools import accumulate, islice
+from bisect import bisect_right
+from array import array
+import mmap
+import re
+
+class MmapView:
+    # Number of lines inserted above and below the viewed line.
+    margin = 500
+
+    # Number of bytes that are scanned per step when
+    # indexing the line offsets.
+    chunk  = 4 * 1024 * 1024
+
+    def __init__(self, area, filename):
+        self.area    = area
+        self.fd      = open(filename, 'rb')
+        self.map     = mmap.mmap(self.fd.fileno(), 0, access=mmap.ACCESS_READ)
+        self.charset = area.charset if area.charset else 'latin-1'
+
+        # The offset of the first byte of each one of the lines
+        # that were indexed so far, lines[n - 1] is the line n.
+        self.lines   = array('Q', [0])
+        self.pos     = 0
+
+        # The window is the range of lines line0 <= line < line1.
+        self.line0   = 1
+        self.line1   = 1
+
+        self.scroll  = area.cget('yscrollcommand')
+        self.undo    = area.cget('undo')
+        self.funcid  = None
+        self.indexer = area.after_idle(self.index_bg)
+
+        # Each window that is loaded would be kept in the undo stack.
+        area.configure(yscrollcommand=self.on_scroll, undo=False)
+        area.edit_reset()
+
+    def close(self):
+        """
+        Release the file and restore the AreaVi instance.
+        """
+
+        self.area.after_cancel(self.indexer)
+        if self.funcid:
+            self.area.after_cancel(self.funcid)
+
+        self.area.configure(yscrollcommand=self.scroll, state='normal',
+            undo=self.undo)
+        self.area.edit_reset()
+        self.map.close()
+        self.fd.close()
+
+    def step(self):
+        """
+        Index the line offsets of the next chunk of bytes. It returns
+        False when the whole file is indexed.
+        """
+
+        if self.pos >= len(self.map):
+            return False
+
+        data = self.map[self.pos:self.pos + self.chunk]
+        lens = map(len, data.split(b'\n')[:-1])
+
+        # The first offset is either 0 or the start of a line
+        # that began in the previous chunk.
+        starts = accumulate(map((1).__add__, lens), initial=self.pos)
+        self.lines.extend(islice(starts, 1, None))
+        self.pos = self.pos + len(data)
+        return True
+
+    def index_bg(self):
+        """
+        Index the file in background so its size in lines gets known.
+        """
+
+        if self.step():
+            self.indexer = self.area.after(10, self.index_bg)
+
+    def index_line(self, line):
+        """
+        Index the file until the offset of line is known or the
+        whole file is indexed.
+        """
+
+        while len(self.lines) < line and self.step():
+            pass
+
+    def index_offset(self, pos):
+        """
+        Index the file until the line that contains the byte
+        offset pos is known. It returns the line.
+        """
+
+        while self.pos <= pos and self.step():
+            pass
+        return bisect_right(self.lines, pos)
+
+    def offset(self, line):
+        """
+        The offset of the first byte of a line, lines after
+        the last one map to the size of the file.
+        """
+
+        self.index_line(line)
+        if line > len(self.lines):
+            return len(self.map)
+        return self.lines[line - 1]
+
+    def load(self, line):
+        """
+        Insert the window of lines around line.
+        """
+
+        self.index_line(line + self.margin + 1)
+        line       = min(max(line, 1), len(self.lines))
+        self.line0 = max(1, line - self.margin)
+        self.line1 = min(len(self.lines) + 1, line + self.margin + 1)
+
+        data = self.map[self.offset(self.line0):self.offset(self.line1)]
+        data = data.decode(self.charset, 'replace')
+
+        # The Text widget adds the last newline.
+        if data.endswith('\n'):
+            data = data[:-1]
+
+        self.area.configure(state='normal')
+        self.area.delete('1.0', 'end')
+        self.area.insert('1.0', data)
+        self.area.configure(state='disabled')
+
+    def show(self, line):
+        """
+        Make sure line is in the window then return its line
+        in the Text widget.
+        """
+
+        if not self.line0 <= line < self.line1:
+            self.load(line)
+        return line - self.line0 + 1
+
+    def lineno(self, line):
+        """
+        The line of the file that corresponds to a line of the Text widget.
+        """
+
+        return line + self.line0 - 1
+
+    def at_end(self):
+        return self.pos >= len(self.map) and self.line1 > len(self.lines)
+
+    def on_scroll(self, first, last):
+        """
+        Used as yscrollcommand, it moves the window when the view
+        gets close to one of its edges.
+        """
+
+        first, last = float(first), float(last)
+        if self.scroll:
+            self.area.tk.call(self.area.tk.splitlist(self.scroll)
+                + self.fractions(first, last))
+
+        near = (first < 0.1 and self.line0 > 1) \
+            or (last > 0.9 and not self.at_end())
+
+        if near and not self.funcid:
+            self.funcid = self.area.after_idle(self.recenter)
+
+    def fractions(self, first, last):
+        """
+        Map the fractions of the window that are visible to
+        fractions of the file.
+        """
+
+        size = max(len(self.map), 1)
+        pos0 = self.offset(self.line0)
+        pos1 = self.offset(self.line1)
+        return (pos0 + first * (pos1 - pos0)) / size, \
+            (pos0 + last * (pos1 - pos0)) / size
+
+    def moveto(self, fraction):
+        """
+        Show the line at fraction of the file, it is used when
+        the scrollbar is dragged.
+        """
+
+        pos  = int(min(max(fraction, 0), 1) * len(self.map))
+        line = self.index_offset(min(pos, max(len(self.map) - 1, 0)))
+        self.area.yview('%s.0' % self.show(line))
+
+    def recenter(self):
+        """
+        Move the window to be centered at the top visible line. It keeps
+        the cursor position when it is still in the window.
+        """
+
+        self.funcid = None
+        top         = self.lineno(self.area.indexref('@0,0')[0])
+        line, col   = self.area.indexref('insert')
+        line        = self.lineno(line)
+
+        self.load(top)
+        self.area.yview('%s.0' % self.show(top))
+
+        if self.line0 <= line < self.line1:
+            self.area.mark_set('insert', '%s.%s' % (self.show(line), col))
+        else:
+            self.area.mark_set('insert', '@0,0')
+
+    def seek(self, regex, backwards=False, nocase=False):
+        """
+        Search regex in the file out of the window. When it is found then
+        the window is moved over the match and the Text index of the match
+        is returned. The regex is matched with python re.
+        """
+
+        flags = re.MULTILINE | re.IGNORECASE if nocase else re.MULTILINE
+        regex = re.compile(regex.encode(self.charset), flags)
+
+        if backwards:
+            pos = self.search_backwards(regex, self.offset(self.line0))
+        else:
+            match = regex.search(self.map, self.offset(self.line1))
+            pos   = match.start() if match else None
+
+        if pos is None:
+            return
+
+        line = self.index_offset(pos)
+        col  = self.map[self.lines[line - 1]:pos].decode(self.charset, 'replace')
+        return '%s.%s' % (self.show(line), len(col))
+
+    def search_backwards(self, regex, pos):
+        """
+        Return the offset of the last match of regex that ends before pos.
+        The file is scanned backwards in chunks that overlap a bit so
+        matches on the chunk edges aren't missed.
+        """
+
+        while pos > 0:
+            start = max(0, pos - self.chunk)
+            match = None
+
+            for match in regex.finditer(self.map, start, pos):
+                pass
+
+            if match:
+                return match.start()
+            pos = start + min(4096, self.chunk // 2) if start else 0
+
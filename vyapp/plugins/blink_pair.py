@@ -4,39 +4,40 @@ Overview
 
 This plugin implements a mechanism to highligh pairs of ( ) [ ] { }.
 
-
+The pairs are highlighted when the cursor is moved or the text
+is changed.
 """
-from vyapp.areavi import AreaVi
-from vyapp.app import root
 
 class BlinkPair:
     setup={'background':'pink', 
    'foreground':'black'}
-    max=1500
-    timeout=2000
     pairs = ('(', ')'), ('[', ']'), ('{', '}')
+    max   = 1500
 
     def __init__(self, area):
+        self.area   = area
+        self.funcid = None
+
         area.tag_config('(BLINK)', **self.setup)
+        area.bind('<KeyRelease>', self.schedule, add=True)
+        area.bind('<ButtonRelease-1>', self.schedule, add=True)
+        area.add_edit_hook(lambda *args: self.schedule())
+
+    def schedule(self, event=None):
+        """
+        Blink once when the application gets idle.
+        """
+
+        if not self.funcid:
+            self.funcid = self.area.after_idle(self.blink)
+
+    def blink(self):
+        self.funcid = None
+        self.area.tag_remove('(BLINK)', '1.0', 'end')
 
-    @classmethod
-    def scale(cls):
-        loop = lambda: root.after(cls.timeout, cls.scale)
-        root.after_idle(loop)
-        area = root.focus_get()
-        if isinstance(area, AreaVi):
-            cls.blink(area)
-
-    @classmethod
-    def blink(cls, area):
-        index0  = 'insert -%sc' % cls.max
-        index1  = 'insert +%sc' % cls.max
-
-        area.tag_remove('(BLINK)', index0, index1)
-        for lhs, lhr in cls.pairs:
-            index = area.case_pair('insert', cls.max, lhs, lhr)
+        for lhs, lhr in self.pairs:
+            index = self.area.case_pair('insert', self.max, lhs, lhr)
             if index: 
-                area.tag_add('(BLINK)', index, '%s +1c' % index)
+                self.area.tag_add('(BLINK)', index, '%s +1c' % index)
 
 install = BlinkPair
-root.bind('<<Started>>', lambda event: BlinkPair.scale())
\ No newline at end of file
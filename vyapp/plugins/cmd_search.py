@@ -22,7 +22,7 @@ def find(area, regex, handle, *args, **kwargs):
 
     index='1.0', stopindex='end', forwards=None, 
     backwards=False, exact=False, regexp=True, nocase=False, elide=False, 
-    nolinestop=False
+    nolinestop=False, engine='tcl'
     """
     seq = area.find(regex, *args, **kwargs)    
     for ind in seq:
@@ -40,7 +40,7 @@ def sniff(area, regex, handle, *args, **kwargs):
 
     index='1.0', stopindex='end', forwards=None, 
     backwards=False, exact=False, regexp=True, nocase=False, elide=False, 
-    nolinestop=False
+    nolinestop=False, engine='tcl'
 
     """
     seq = area.collect('sel', regex, *args, **kwargs) 
@@ -56,7 +56,7 @@ def sel(area, regex, *args, **kwargs):
 
     index='1.0', stopindex='end', forwards=None, 
     backwards=False, exact=False, regexp=True, nocase=False, elide=False, 
-    nolinestop=False
+    nolinestop=False, engine='tcl'
     """
     area.select_matches('sel', 
     area.find(regex, *args, **kwargs))
@@ -74,7 +74,7 @@ def gsub(area, regex, data, *args, **kwargs):
 
     index='1.0', stopindex='end', forwards=None, 
     backwards=False, exact=False, regexp=True, nocase=False, elide=False, 
-    nolinestop=False
+    nolinestop=False, engine='tcl'
 
     """
     area.replace_all(regex, data, *args, **kwargs)
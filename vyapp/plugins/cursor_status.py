@@ -15,7 +15,7 @@ class CursorStatus:
         """
     
         row, col = self.area.indexref('insert')
-        root.status.set_line(row)
+        root.status.set_line(self.area.lineno('insert'))
         root.status.set_column(col)
         self.funcid = self.area.after(self.timeout, self.update)
 
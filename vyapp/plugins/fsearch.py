@@ -2,8 +2,9 @@
 Overview
 ========
 
-Run locate command and drop output on the current AreaVi instance.
-The locate comand is run with lax like regex. 
+Locate files and drop the paths on the current AreaVi instance. The
+files of the project or of Sniper.c_dirs are ranked by a fuzzy match of
+the pattern like in fsniffer.
 
 The main difference from  fsniffer it consists of fsearch displaying 
 also dirs and being useful with mc plugin.
@@ -15,56 +16,66 @@ Namespace: fsearch
 
 Mode: NORMAL
 Event: <Key-W>
-Description: Insert locale command output in the current AreaVi instance.
+Description: Insert the previous located files in the current AreaVi instance.
 
 
 Mode: NORMAL
 Event: <Control-w>
-Description: Ask for a filename pattern to be located using unix locate command.
+Description: Ask for a filename pattern to be located, the best match
+is shown in the status bar while it is typed.
 
 """
 
-from vyapp.regutils import build_regex
-from subprocess import Popen, STDOUT, PIPE
+from vyapp.plugins.fsniffer import get_dirs
+from vyapp.fileindex import get_index
 from vyapp.ask import Get
 from vyapp.app import root
 
-
 class FSearch:
+    # The number of paths that are inserted.
+    limit = 200
+
     def __init__(self, area):
         self.area   = area
         self.output = ''
 
         area.install('fsearch', 
         ('NORMAL', '<Key-W>', self.display),
-        ('NORMAL', '<Control-w>',  lambda event: Get(events={
-        '<Return>' : self.find, '<<Idle>>': self.update_pattern,
-        '<Escape>': lambda wid: True})))
+        ('NORMAL', '<Control-w>', self.ask))
+
+    def ask(self, event):
+        self.get_index()
+        Get(events={'<Return>' : self.find, 
+        '<<Idle>>': self.update_pattern, '<Escape>': lambda wid: True})
+
+    def get_index(self):
+        return get_index(get_dirs(self.area, False))
 
     def display(self, event):
         self.area.swap(self.output, '1.0', 'end')
         root.status.set_msg('Previous located files.')
 
     def update_pattern(self, wid):
-        pattern = build_regex(wid.get(), '.*')
-        root.status.set_msg('File pattern: %s' % pattern)
-
-    def run_cmd(self, pattern):
-        cmd   = ['locate', '--limit', '200']
-        regex = build_regex(pattern, '.*')
-        cmd.extend(['--regexp', regex])
-
-        child = Popen(cmd, stdout=PIPE, stderr=STDOUT, 
-        encoding=self.area.charset)
+        index = self.get_index()
+        if not index.ready:
+            root.status.set_msg('Indexing files...')
+            return
 
-        output = child.communicate()[0]
-        return output
+        paths = index.rank(wid.get(), self.limit, dirs=True)
+        root.status.set_msg('Files: %s %s' % (len(paths), 
+            paths[0] if paths else ''))
 
     def find(self, wid):
-        pattern = wid.get()
-        self.output = self.run_cmd(pattern)
+        # The table is locked while it is built.
+        index = self.get_index()
+        if not index.ready:
+            root.status.set_msg('Indexing files...')
+            return
+
+        paths = index.rank(wid.get(), self.limit, dirs=True)
+        self.output = ''.join('%s\n' % ind for ind in paths)
         self.area.swap(self.output, '1.0', 'end')
-        root.status.set_msg('Locate results: %s' % self.output.count('\n'))
+        root.status.set_msg('Locate results: %s' % len(paths))
         return True
 
 install = FSearch
@@ -2,7 +2,9 @@
 Overview
 ========
 
-Quickly open files in vy by using locate command.
+Quickly open files in vy. The files of the folders are kept in a table
+that is updated as they change, the paths are ranked by a fuzzy match of
+the pattern as it is typed.
 
 Key-Commands
 ============
@@ -11,7 +13,8 @@ Namespace: fsniffer
 
 Mode: NORMAL
 Event: <Alt-y>
-Description: Ask for a filename pattern to be located using unix locate command.
+Description: Ask for a filename pattern, the best match is shown
+in the status bar while it is typed.
 
 
 Mode: INPUT
@@ -20,92 +23,85 @@ Description: Display possible file matches on a line picker widget.
 
 Mode: INPUT
 Event: <Control-w>
-Description: Set wide search. In wide search the locate command will
-search for files in the whole file system. When an AreaVi instance has 
-no project path set then wide search as false will have no efect. 
-When wide search is False and project path is set then it searches in the
-current file project dirs.
+Description: Set wide search. In wide search the files are searched
+in the folders of Sniper.c_dirs or in AreaVi.HOME when they aren't
+set. When an AreaVi instance has no project path set then wide search
+as false will have no efect. When wide search is False and project path is set then it
+searches in the current file project dirs.
 
 """
 
-from vyapp.regutils import build_regex
-from subprocess import Popen, STDOUT, PIPE
+from vyapp.fileindex import get_index
 from vyapp.widgets import LinePicker
+from vyapp.areavi import AreaVi
 from vyapp.ask import Get
 from vyapp.app import root
-from os.path import basename
-
+from os.path import basename, expanduser
+from vyapp import grep
 
 class FSniffer:
     options = LinePicker()
     wide    = True
 
+    # The number of files that are shown.
+    limit   = 200
+
     def __init__(self, area):
         self.area = area
         area.install('fsniffer', 
         ('NORMAL', '<Alt-t>', lambda e: self.options.display()), 
-        ('NORMAL', '<Alt-y>', lambda event: Get(events={'<Return>' : self.find,
+        ('NORMAL', '<Alt-y>', self.ask))
+
+    def ask(self, event):
+        # The table starts being built while the pattern is typed.
+        self.get_index()
+        Get(events={'<Return>' : self.find,
         '<Control-w>':self.set_wide, '<<Idle>>': self.update_pattern,
-        '<Escape>': lambda wid: True})))
-    
+        '<Escape>': lambda wid: True})
+
+    def get_index(self):
+        return get_index(get_dirs(self.area, self.wide))
+
     @classmethod
     def set_wide(cls, event):
         FSniffer.wide = False if FSniffer.wide else True
         root.status.set_msg('Set wide search: %s' % FSniffer.wide)
 
     def update_pattern(self, wid):
-        pattern = build_regex(wid.get(), '.*')
-        root.status.set_msg('File pattern: %s' % pattern)
-
-    def make_cmd(self, pattern):
-        # When FSniffer.wide is False it searches in the current 
-        # Areavi instance project.
-        cmd   = ['locate', '--limit', '200']
-        regex = build_regex(pattern, '.*')
-
-        if self.wide or not self.area.project:
-            cmd.extend(['--regexp', regex])
-        else:
-            cmd.extend(['--regexp', '%s.*%s' % (
-                self.area.project, regex)])
-
-        # Used to filter only files because locate doesn't support 
-        # searching only for files.
-        cmd = '%s | %s' % (' '.join(cmd), '''while read -r file; do
-          [ -d "$file" ] || printf '%s\n' "$file"; done''')
-        return cmd
+        index = self.get_index()
+        if not index.ready:
+            root.status.set_msg('Indexing files...')
+            return
 
-    def run_cmd(self, pattern):
-        cmd   = self.make_cmd(pattern)
-        child = Popen(cmd, stdout=PIPE, stderr=STDOUT, 
-        encoding=self.area.charset, shell=True)
-
-        output = child.communicate()[0]
-        return output
+        paths = index.rank(wid.get(), self.limit)
+        root.status.set_msg('Files: %s %s' % (len(paths), 
+            paths[0] if paths else ''))
 
     def find(self, wid):
+        # The table is locked while it is built.
+        index = self.get_index()
+        if not index.ready:
+            root.status.set_msg('Indexing files...')
+            return
+
         pattern = wid.get()
-        output = self.run_cmd(pattern)
-        if output:
-            self.fmt_output(output)
+        paths   = index.rank(pattern, self.limit)
+
+        if paths:
+            self.options([(ind, '0', basename(ind)) for ind in paths])
         else:
             root.status.set_msg('No results:%s!' % pattern)
         return True
 
-    def fmt_output(self, output):
-        output = output.strip('\n').rstrip('\n')
-        ranges = output.split('\n')
-        ranges = [ind for ind in ranges
-            if ranges]
+def get_dirs(area, wide):
+    """
+    The folders where the files are searched, when wide is False
+    it is the project of area.
+    """
 
-        ranges = [(ind, '0', basename(ind)) for ind in ranges]
-
-        self.options(ranges)
+    if wide or not area.project:
+        return tuple(grep.DIRS) or (AreaVi.HOME or expanduser('~'),)
+    return (area.project,)
 
 install = FSniffer
 
-
-
-
-
-
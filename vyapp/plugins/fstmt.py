@@ -31,10 +31,9 @@ nor .hg it performs the search in the vy HOME directory.
 
 """
 
-from subprocess import Popen, STDOUT, PIPE
 from vyapp.widgets import LinePicker
 from vyapp.areavi import AreaVi
-from re import findall, escape
+from re import escape
 from vyapp.base import printd
 from vyapp.app import root
 
@@ -67,22 +66,15 @@ class Fstmt:
         cmd =  [Fstmt.path, '--nocolor', '--nogroup', 
         '--vimgrep', '--noheading']
         cmd.extend(args)
-        cmd.extend([pattern, dir])
+        cmd.extend(['--', pattern, dir])
         return cmd
 
     def run_cmd(self, pattern, *args):
         dir    = self.area.project
         dir    = dir if dir else AreaVi.HOME
         dir    = dir if dir else self.area.filename
-        child  = Popen(self.make_cmd(pattern, dir, *args), stdout=PIPE, 
-        stderr=STDOUT, encoding=self.area.charset)
-        regex  = '(.+):([0-9]+):[0-9]+:(.+)' 
-        ranges = findall(regex, child.communicate()[0])
-
-        if ranges:
-            self.options(ranges)
-        else:
-            root.status.set_msg('No pattern found!')
+        self.options.grep(self.make_cmd(pattern, dir, *args), 
+        self.area.charset, pattern)
 
     def picker(self, *args):
         pattern = self.catch_pattern()
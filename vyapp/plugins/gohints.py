@@ -29,10 +29,8 @@ class GolangCompletionWindow(CompletionWindow):
 
     def __init__(self, area,  *args, **kwargs):
         self.area = area
-        tmp0      = area.get('1.0', 'insert')
-        tmp1      = area.get('insert', 'end')
-        source    = tmp0 + tmp1
-        offset    = len(tmp0) 
+        source    = area.get('1.0', 'end')
+        offset    = area.offset('insert')
 
         completions = self.completions(source, offset, area.filename)
         CompletionWindow.__init__(self, area, completions, *args, **kwargs)
@@ -70,7 +70,7 @@ class IO:
         except Exception:
             root.status.set_msg('It failed to save data.')
         else:
-            root.status.set_msg('Data saved.')
+            self.saved()
             
     
     def save_quit(self, event):
@@ -80,6 +80,7 @@ class IO:
     
         try:
             self.area.save_data()
+            self.area.sync_data()
         except Exception:
             root.status.set_msg('It failed to save data.')
         else:
@@ -118,6 +119,12 @@ class IO:
         except Exception:
             root.status.set_msg('It failed to save data.')
         else:
+            self.saved()
+
+    def saved(self):
+        # The saves that are done by the Writer thread 
+        # are reported by AreaVi.done_save, views aren't saved.
+        if not (self.area.ASYNC_SAVE or self.area.view):
             root.status.set_msg('Data saved.')
     
     def rename(self, event):
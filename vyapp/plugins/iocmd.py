@@ -25,7 +25,11 @@ def save(area):
     Save the contents of the targeted areavi to disk.
     """
     area.save_data()
-    root.status.set_msg('File saved!')
+
+    # AreaVi.done_save reports the saves of the Writer thread,
+    # views aren't saved.
+    if not (area.ASYNC_SAVE or area.view):
+        root.status.set_msg('File saved!')
 
 @Command('q')
 def quit(area):
@@ -40,7 +44,8 @@ def save_as(area, filename):
     """
 
     area.save_data_as(filename)
-    root.status.set_msg('File saved as %s!' % filename)
+    if not (area.ASYNC_SAVE or area.view):
+        root.status.set_msg('File saved as %s!' % filename)
 
 @Command('lo')
 def load_split(area, filename):
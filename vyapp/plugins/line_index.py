@@ -21,13 +21,17 @@ from tkinter import TclError
 def go_to_pos(area):
     ask = Ask()
 
+    # Line.Col values go through setcur so files that
+    # are opened as views get the line loaded.
     try:
-        area.seecur(ask.data)
-    except TclError:
+        area.setcur(*map(int, ask.data.split('.')))
+    except (TypeError, ValueError):
         pass
+    else:
+        return
 
     try:
-        area.setcur(ask.data)
+        area.seecur(ask.data)
     except TclError:
         pass
 
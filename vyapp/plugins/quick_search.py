@@ -45,43 +45,102 @@ class QuickSearch:
         printd('Quick Search - Setting confs = ', cls.confs)
 
     def start_forwards(self, event):
-        self.index     = self.area.index('insert')
-        self.stopindex = 'end'
-        self.backwards = False
-
-        Get(events = {
-        '<Alt-p>':self.search_down, 
-        '<Alt-o>': self.search_up, 
-        '<<Data>>': self.update, 
-        '<BackSpace>': self.update,
-        '<Destroy>': lambda wid: self.area.tag_remove(
-        '(SEARCH_MATCH)', '1.0', 'end'),
-        '<Escape>':  lambda wid: True})
+        self.start(False, 'end')
 
     def start_backwards(self, event):
+        self.start(True, '1.0')
+
+    def start(self, backwards, stopindex):
         self.index     = self.area.index('insert')
-        self.backwards = True
-        self.stopindex = '1.0'
+        self.backwards = backwards
+        self.stopindex = stopindex
+
+        # The (data, start, end) of the match of each pattern that was
+        # searched, each one extends the previous.
+        self.hits   = []
+        self.match  = None
+        self.funcid = None
 
         Get(events = {
         '<Alt-p>':self.search_down, 
         '<Alt-o>': self.search_up, 
-        '<<Data>>': self.update, 
-        '<BackSpace>': self.update,
-        '<Destroy>': lambda wid: self.area.tag_remove(
-        '(SEARCH_MATCH)', '1.0', 'end'),
+        '<<Data>>': self.schedule, 
+        '<BackSpace>': self.schedule,
+        '<Destroy>': self.stop,
         '<Escape>':  lambda wid: True})
 
+    def schedule(self, wid):
+        # The keys that are typed before it runs are searched at once.
+        if not self.funcid:
+            self.funcid = self.area.after_idle(self.update, wid)
+
+    def stop(self, wid):
+        if self.funcid:
+            self.area.after_cancel(self.funcid)
+        self.funcid = None
+        self.mark(None)
+
     def update(self, wid):
         """
-
+        When the pattern extends one that was searched its matches
+        start after the match of that one so the search goes on from
+        there. The ones that extend a pattern with no match aren't
+        searched.
         """
+
+        self.funcid = None
         data    = wid.get()
         pattern = build_regex(data)
         root.status.set_msg('Pattern:%s' % pattern)
-        self.area.ipick('(SEARCH_MATCH)', pattern,
-        verbose=True, backwards=self.backwards, index=self.index, 
-        nocase=self.nocase, stopindex=self.stopindex)
+
+        while self.hits and not data.startswith(self.hits[-1][0]):
+            self.hits.pop()
+
+        if not data:
+            hit = None
+        elif self.hits and (self.hits[-1][0] == data 
+            or not self.hits[-1][1]):
+            hit = self.hits[-1][1:]
+        else:
+            hit = self.find(pattern, self.hits[-1][1] 
+                if self.hits else None)
+            self.hits.append((data, ) + (hit or (None, None)))
+
+        self.mark(hit if hit and hit[0] else None)
+
+    def find(self, pattern, start):
+        index = self.index
+        if start:
+            index = '%s +1c' % start if self.backwards else start
+
+        match = self.area.isearch(pattern, index, self.stopindex, 
+        backwards=self.backwards, regexp=True, nocase=self.nocase)
+        if match:
+            return match[1:]
+
+        # The match may be in a part of the file that is out
+        # of the MmapView window, ipick seeks it.
+        if self.area.view:
+            self.hits, self.match = [], None
+            return self.area.ipick('(SEARCH_MATCH)', pattern,
+            verbose=True, backwards=self.backwards, index=self.index, 
+            nocase=self.nocase, stopindex=self.stopindex)
+
+    def mark(self, match):
+        """
+        Tag the match, the tag is removed only from the
+        previous match.
+        """
+
+        if self.match:
+            self.area.tag_remove('(SEARCH_MATCH)', *self.match)
+        self.match = match
+
+        if match:
+            self.area.tag_add('(SEARCH_MATCH)', *match)
+            self.area.mark_set('insert', 
+                match[0] if self.backwards else match[1])
+            self.area.see('insert')
 
     def search_up(self, wid):
         """
@@ -89,8 +148,9 @@ class QuickSearch:
         """
         data    = wid.get()
         pattern = build_regex(data)
-        self.area.ipick('(SEARCH_MATCH)', pattern, index='insert', 
+        match   = self.area.ipick('(SEARCH_MATCH)', pattern, index='insert', 
         nocase=self.nocase, stopindex='1.0', backwards=True)
+        self.moved(match)
 
     def search_down(self, wid):
         """
@@ -98,8 +158,14 @@ class QuickSearch:
         """
         data    = wid.get()
         pattern = build_regex(data)
-        self.area.ipick('(SEARCH_MATCH)', pattern, nocase=self.nocase, 
-        stopindex='end', index='insert')
+        match   = self.area.ipick('(SEARCH_MATCH)', pattern, 
+        nocase=self.nocase, stopindex='end', index='insert')
+        self.moved(match)
+
+    def moved(self, match):
+        # The next patterns are searched from the start index again.
+        self.hits  = []
+        self.match = match or self.match
 
 
 install = QuickSearch
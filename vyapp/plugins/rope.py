@@ -56,9 +56,7 @@ class PythonRefactor:
         """
         ask = Ask()
 
-        tmp0    = self.area.get('1.0', 'insert')
-        offset  = len(tmp0)
-
+        offset  = self.area.offset('insert')
         path    = self.get_root_path()
         project = Project(path)
 
@@ -115,8 +113,7 @@ class PythonRefactor:
     def rename(self, name):
         ask = Ask()
 
-        tmp0    = self.area.get('1.0', 'insert')
-        offset  = len(tmp0)
+        offset  = self.area.offset('insert')
         path    = self.get_root_path()
         project = Project(path)
         mod     = path_to_resource(project, self.area.filename)
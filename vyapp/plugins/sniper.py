@@ -37,7 +37,7 @@ Mode: INPUT
 Event: <Control-w>
 Description: Set wide search, in wide search mode sniper
 will be searching in the directories that were set
-in Sniper.dirs. In non wide search sniper will search
+with Sniper.c_dirs. In non wide search sniper will search
 in your current file project and in your AreaVi.HOME.
 
 Mode: INPUT
@@ -46,7 +46,6 @@ Description: Set multiline search.
 
 """
 
-from subprocess import Popen, STDOUT, PIPE
 from vyapp.regutils import build_regex
 from vyapp.widgets import LinePicker
 from vyapp.areavi import AreaVi
@@ -54,17 +53,15 @@ from vyapp.tools import error
 from vyapp.base import printd
 from vyapp.app import root
 from vyapp.ask import Get
-from re import findall
+from os.path import expanduser, join
+from os import makedirs
+from vyapp import grep
 
 class Sniper:
     options = LinePicker()
     # Path to ag program.
     path = 'ag'
 
-    # Dirs where ag will search when in 
-    # wide mode.
-    dirs = ()
-
     # Sniper search options.
     file_regex = ''
     ignore     = ''
@@ -92,8 +89,8 @@ class Sniper:
         '<Control-m>':self.set_multiline, 
         '<Escape>':  lambda wid: True})))
 
-        if not self.dirs:
-            printd('Sniper - Sniper.dirs is not set.')
+        if not grep.DIRS:
+            printd('Sniper - Sniper.c_dirs is not set.')
 
     @classmethod
     def c_path(cls, path='ag'):
@@ -108,11 +105,24 @@ class Sniper:
     @classmethod
     def c_dirs(cls, *dirs):
         """
-        Folders where ag will be searching for data.
+        Folders where ag will be searching for data
+        in wide mode.
         """
-        cls.dirs = dirs
+        grep.DIRS = dirs
         printd('Sniper - Setting dirs =', *dirs)
 
+    @classmethod
+    def c_index(cls, dir=join(expanduser('~'), '.vy', 'trigrams')):
+        """
+        Keep trigram indexes of the searched folders in dir, the
+        searches of Sniper and Fstmt are done in process and only
+        the files that may match are read.
+        """
+
+        makedirs(dir, exist_ok=True)
+        grep.INDEX = dir
+        printd('Sniper - Setting trigram index =', dir)
+
     def set_wide(self, wid):
         Sniper.wide = False if Sniper.wide else True
         root.status.set_msg('Set wide search: %s' % Sniper.wide)
@@ -163,40 +173,32 @@ class Sniper:
             cmd.append('--multiline')
 
         if self.type == 1:
-            cmd.append(build_regex(pattern))
-        elif self.type == 2:
-            cmd.append(pattern)
-        else:
-            cmd.extend(['-Q', pattern])
+            pattern = build_regex(pattern)
+        elif self.type != 2:
+            cmd.append('-Q')
+
+        # The pattern may start with a dash.
+        cmd.extend(['--', pattern])
 
         if not Sniper.wide:
             cmd.extend([self.area.project, AreaVi.HOME])
         else:
-            cmd.extend(Sniper.dirs)
+            cmd.extend(grep.DIRS)
         return cmd
 
     def run_cmd(self, pattern):
         cmd = self.make_cmd(pattern)
-        child = Popen(cmd, stdout=PIPE, stderr=STDOUT, 
-        encoding=self.area.charset)
-        return child.communicate()[0]
+        self.options.grep(cmd, self.area.charset, pattern)
 
     @error
     def find(self, wid):
         """
+        The hits show up in the picker while ag is running.
         """
 
         pattern = wid.get()
         root.status.set_msg('Set pattern:%s!' % pattern)
-
-        output = self.run_cmd(pattern)
-        regex  = '(.+):([0-9]+):[0-9]+:(.+)' 
-        ranges = findall(regex, output)
-
-        if ranges:
-            self.options(ranges)
-        else:
-            root.status.set_msg('No results:%s!' % pattern)
+        self.run_cmd(pattern)
         return True
 
 install = Sniper
@@ -0,0 +1,118 @@
+"""
+This module implements the files where Spider keeps the runs of the
+tokens of the files it colorized, they are applied when the files are
+opened again and didn't change so the text isn't lexed.
+
+A file starts with MAGIC and the size of a json header that holds the key,
+the tag names and the lexer states. The runs follow as a zlib compressed
+array of ints, for each line there is the number of runs then the tag,
+start and end column of each run. The end column is -1 when the run
+goes up to the next line.
+"""
+
+from array import array
+from hashlib import sha1
+import struct
+import json
+import zlib
+import os
+
+MAGIC = b'VYTK\x01'
+SIZE  = struct.Struct('<I')
+
+def get_key(filename, data, lexer, theme):
+    """
+    The key of the runs of data that was loaded from filename, it raises
+    OSError when the file doesn't exist.
+    """
+
+    st  = os.stat(filename)
+    sig = sha1(data.encode('utf-8', 'surrogatepass')).hexdigest()
+    return [filename, st.st_size, st.st_mtime_ns, sig, lexer, theme]
+
+def get_path(dir, filename):
+    return os.path.join(dir, sha1(filename.encode('utf-8',
+        'surrogatepass')).hexdigest())
+
+def dump(path, key, runs, lines, stacks):
+    """
+    Write the runs of the lines and the lexer states to path.
+    """
+
+    tags = {}
+    ints = array('i')
+
+    for line in runs:
+        ints.append(len(line))
+        for tag, scol, ecol in line:
+            ints.extend((tags.setdefault(tag, len(tags)), scol,
+                -1 if ecol is None else ecol))
+
+    head = json.dumps({'key': key, 'tags': list(tags),
+        'lines': lines, 'stacks': stacks}).encode('utf-8')
+
+    # The file is replaced at once so it is never read half written.
+    with open(path + '.tmp', 'wb') as fd:
+        fd.write(MAGIC + SIZE.pack(len(head)) + head)
+        fd.write(zlib.compress(ints.tobytes(), 1))
+    os.replace(path + '.tmp', path)
+
+def read(path, key):
+    """
+    It returns the header and the ints of the runs of path, the runs
+    aren't read when the file isn't a cache file for key.
+    """
+
+    with open(path, 'rb') as fd:
+        if fd.read(len(MAGIC)) != MAGIC:
+            return None, None
+
+        size, = SIZE.unpack(fd.read(SIZE.size))
+        head  = json.loads(fd.read(size).decode('utf-8'))
+        if head['key'] != key:
+            return None, None
+
+        ints = array('i')
+        ints.frombytes(zlib.decompress(fd.read()))
+    return head, ints.tolist()
+
+def load(path, key):
+    """
+    It returns (runs, lines, stacks) as they were dumped to path
+    or None when the file doesn't exist or its key differs.
+    """
+
+    try:
+        head, ints = read(path, key)
+    except (OSError, ValueError, KeyError, struct.error, zlib.error):
+        return None
+
+    if head is None:
+        return None
+
+    tags = head['tags']
+    runs = []
+    ind  = 0
+    size = len(ints)
+
+    while ind < size:
+        count = ints[ind]
+        runs.append(tuple((tags[ints[pos]], ints[pos + 1],
+            None if ints[pos + 2] < 0 else ints[pos + 2])
+                for pos in range(ind + 1, ind + 1 + 3 * count, 3)))
+        ind = ind + 1 + 3 * count
+
+    stacks = [tuple(ind) for ind in head['stacks']]
+    return runs, head['lines'], stacks
+
+def store(dir, filename, data, lexer, theme, runs, lines, stacks):
+    """
+    Dump the runs of data that was saved to filename in the folder dir,
+    it returns the error when it fails.
+    """
+
+    try:
+        dump(get_path(dir, filename), get_key(filename, data, lexer, 
+            theme), runs, lines, stacks)
+    except OSError as e:
+        return e
@@ -1,12 +1,56 @@
 """
     :)
 """
-from vyapp.plugins.syntax.tools import get_tokens_unprocessed_matrix
+from vyapp.plugins.syntax.tools import get_lines_runs, relex, has_states
 from vyapp.plugins.syntax.keys import PRECEDENCE_TABLE, DEFAULT
-from pygments.lexers import get_lexer_for_filename, guess_lexer
+from vyapp.plugins.syntax.worker import Worker
+from vyapp.plugins.syntax.cache import get_key, get_path, load, store
+from vyapp.tools import consume_iter
+from vyapp.base import printd
+from os.path import expanduser, join, splitext, basename
+from os import makedirs
+from fnmatch import translate
+from bisect import bisect_left, bisect_right
+from time import time
+import json
+import re
 
 
 class Spider:
+    # The lexer state is kept at least every step lines.
+    step = 50
+
+    # The tags are applied in slices that take at most budget
+    # seconds, the time is checked every chunk lines.
+    budget = 0.008
+    chunk  = 100
+
+    # Number of lines after the visible ones that are colorized
+    # before the rest of the text when it is loaded.
+    margin = 100
+
+    # Number of lines after the edited ones that are lexed at most 
+    # as the user types. The lexer sees them all since some regexes
+    # look ahead, it usually stops way before.
+    window = 1000
+
+    # The thread that lexes the text, it is shared by all instances.
+    WORKER = None
+
+    # The names of the lexers that were found for an extension and
+    # shebang, it is kept in the file CACHE when it is set.
+    LEXERS = {}
+    CACHE  = None
+
+    # The regex of the filename patterns of the lexers that aren't
+    # *.ext like CMakeLists.txt, the files that match them are kept
+    # by name instead of by extension.
+    NAMES = None
+
+    # The folder where the runs of the files that were colorized
+    # are kept, see Spider.c_tokens.
+    TOKENS = None
+
     def  __init__(self, area, theme, max=10):
         self.area          = area
         self.max           = max
@@ -18,30 +62,168 @@ class Spider:
         self.default_background = theme.background_color \
         if theme.background_color else 'black'
         self.lexer = None
+
+        # The lines where the lexer state is known and the states,
+        # the first line is always there.
+        self.lines  = [1]
+        self.stacks = [('root',)]
+
+        # The lines from lag[0] on are lag[1] lines off, they are
+        # shifted when they are read, see Spider.settle.
+        self.lag    = None
+
+        # The runs that were applied to each line, runs[n - 1] is the 
+        # line n. It is None for lines whose tags aren't known.
+        self.runs   = []
+
+        # The range of lines that were edited since the last highlight
+        # and the one that is being lexed or tagged.
+        self.damage  = None
+        self.pending = None
+
+        # The first and last visible lines that were tagged last time
+        # for lexers whose state can't be resumed.
+        self.shown   = None
+
+        # The range of lines that were edited since they were
+        # colorized as the user types.
+        self.live    = None
+        self.funcid  = None
+
+        # Number of jobs in the lexer thread and steps of tagging
+        # that are going on.
+        self.busy    = 0
+
+        # It changes with the text so results of the lexer that
+        # are late get dropped.
+        self.generation = 0
+
+        # The runs are written to TOKENS once the text that was
+        # loaded or saved is colorized.
+        self.dump = False
+
         area.configure(background = self.default_background)
         area.configure(foreground = self.default_style)
 
+        # The tags that change how the text looks, the ones that are
+        # added with the current lexer and all the ones that may be there.
+        self.styled = set()
+        self.tags   = set()
+
         for ind in self.styles.keys():
             self.set_token_style(ind)
 
-        area.install('syntax', (-1, '<<LoadData>>', 
+        self.names = self.styled.union(DEFAULT, *PRECEDENCE_TABLE.values())
+
+        area.add_edit_hook(self.on_edit)
+        area.install('syntax', (-1, '<<LoadData>>',
         lambda event: self.update_all()),
-        (-1, '<<SaveData>>', lambda event: self.update_all()),
+        (-1, '<<SaveData>>', lambda event: self.update_saved()),
+        (-1, '<<Data>>', lambda event: self.schedule()),
+        (-1, '<<Idle>>', lambda event: self.update()),
         (-1, '<Escape>', lambda event: self.update()))
 
+    @classmethod
+    def c_cache(cls, filename=join(expanduser('~'), '.vy', 'lexers.json')):
+        """
+        Keep the lexers that were found for each extension and shebang
+        in filename so they aren't looked up in the next sessions.
+        """
+
+        cls.CACHE = filename
+        try:
+            with open(filename) as fd:
+                cls.LEXERS.update(json.load(fd))
+        except (OSError, ValueError):
+            pass
+        printd('Spider - Setting lexer cache =', filename)
+
+    @classmethod
+    def c_tokens(cls, dir=join(expanduser('~'), '.vy', 'tokens')):
+        """
+        Keep the runs of the files in dir so files that didn't change
+        are colorized without lexing them when they are opened.
+        """
+
+        makedirs(dir, exist_ok=True)
+        cls.TOKENS = dir
+        printd('Spider - Setting token cache =', dir)
+
     def set_lexer(self):
         """
         Try to detect the lexer by filename if it fails
         then try to guess the lex by shebang statement.
-        
+
         The shebang statement should be placed in the first
         20 lines of the file.
+
+        The lexer is looked up once for each extension and shebang,
+        files that a lexer matches by name like CMakeLists.txt are
+        kept by name. Guesses without a shebang depend on the text
+        so they aren't kept.
         """
 
+        # pygments.lexers is imported once a file needs it.
+        from pygments.lexers import find_lexer_class
+
+        name    = basename(self.area.filename)
+        ext     = splitext(name)[1]
+        shebang = self.area.get('1.0', '1.0 lineend')
+        shebang = shebang if shebang.startswith('#!') else ''
+        key     = '%s\n%s' % (name if not ext or self.is_named(name)
+            else '*' + ext, shebang)
+
+        lexer = Spider.LEXERS.get(key)
+        lexer = find_lexer_class(lexer) if lexer else None
+
+        if lexer:
+            self.lexer = lexer()
+        else:
+            self.find_lexer(key, shebang)
+
+        # Tokens without a style are skipped unless they are used 
+        # to find where to start lexing in Spider.update.
+        self.tags = self.styled if has_states(self.lexer) else \
+            self.styled.union(PRECEDENCE_TABLE.get(
+                tuple(self.lexer.aliases), DEFAULT))
+
+    @classmethod
+    def is_named(cls, name):
+        """
+        Whether a lexer has a pattern other than *.ext that matches
+        name, the lexer found for it may not be the one of the extension.
+        """
+
+        if cls.NAMES is None:
+            from pygments.lexers import get_all_lexers
+            patterns = {ind for lexer in get_all_lexers() for ind in lexer[2]
+                if not re.fullmatch(r'\*\.[^*?\[\]./]+', ind)}
+            cls.NAMES = re.compile('|'.join(map(translate, patterns)))
+        return cls.NAMES.match(name) is not None
+
+    def find_lexer(self, key, shebang):
+        """
+        Look the lexer up then keep its name for key.
+        """
+
+        from pygments.lexers import get_lexer_for_filename, guess_lexer
+
         try:
             self.lexer = get_lexer_for_filename(self.area.filename, '')
         except Exception as e:
             self.lexer = guess_lexer(self.area.get('1.0', '20.0'))
+            if not shebang:
+                return
+
+        Spider.LEXERS[key] = self.lexer.name
+        if not Spider.CACHE:
+            return
+
+        try:
+            with open(Spider.CACHE, 'w') as fd:
+                json.dump(Spider.LEXERS, fd)
+        except OSError as e:
+            printd('Spider - Failed to save lexer cache', e)
 
     def update_all(self):
         """
@@ -51,73 +233,523 @@ class Spider:
         # When it need to update all the text
         # just save the lexer for later usage.
         self.set_lexer()
-        self.tag_tokens('1.0', 'end')
+        self.dump = bool(Spider.TOKENS) and not self.area.view
+
+        if not self.load_runs():
+            self.tag_all()
+
+    def load_runs(self):
+        """
+        Apply the runs that were kept for the file when it didn't
+        change. The visible lines are tagged at once.
+        """
+
+        if not Spider.TOKENS or self.area.view:
+            return False
+
+        data = self.area.get('1.0', 'end')
+        try:
+            key = get_key(self.area.filename, data, 
+                self.lexer.name, self.theme.__name__)
+        except OSError:
+            return False
+
+        result = load(get_path(Spider.TOKENS, self.area.filename), key)
+        if not result:
+            return False
+
+        runs, self.lines, self.stacks = result
+        self.lag    = None
+        self.runs   = []
+        self.damage = None
+        self.live   = None
+        self.dump   = False
+
+        top, bottom = self.visible()
+        self.paint(top, runs[top - 1:bottom])
+        self.pending = (1, len(runs))
+        self.retag(1, runs)
+        return True
+
+    def store(self):
+        """
+        Write the runs to TOKENS from the lexer thread when all
+        the lines are colorized.
+        """
+
+        count = self.area.lineindex.count()
+        if len(self.runs) < count or None in self.runs[:count]:
+            return
+
+        self.settle()
+        if not Spider.WORKER:
+            Spider.WORKER = Worker()
+
+        self.dump = False
+        Spider.WORKER.submit(store, (Spider.TOKENS, 
+            self.area.filename, self.area.get('1.0', 'end'), self.lexer.name, 
+                self.theme.__name__, self.runs[:count], self.lines[:], 
+                    self.stacks[:]), lambda error: error and printd(
+                        'Spider - Failed to save tokens', error))
+
+    def tag_all(self):
+        """
+        Lex all the text with the current lexer. The visible lines are
+        colorized at once, then the lines below them and the rest
+        of the text from the lexer thread.
+
+        When the visible lines are far from the start they are lexed
+        from the initial state of the lexer, it is fixed later. It is
+        the same for lexers whose state can't be resumed, the text
+        is lexed from the start in the lexer thread then.
+        """
+
+        self.lines  = [1]
+        self.stacks = [('root',)]
+        self.lag    = None
+        self.runs   = []
+        self.damage = None
+        self.live   = None
+
+        top, bottom = self.visible()
+        if not has_states(self.lexer):
+            self.shown = (top, bottom)
+            self.guess(top, bottom + 1)
+            self.tag_tokens('1.0', 'end')
+            return
+
+        count = self.area.lineindex.count()
+
+        if top > self.margin:
+            self.guess(top, bottom + 1)
+            self.relex(1, count, bottom + self.margin)
+            return
+
+        data = self.area.get('1.0', 'end')
+        runs, lines, stacks, end = relex(self.lexer, data, 1, 
+            ('root',), 0, {}, self.step, self.tags, bottom + 1)
+
+        self.done_relex(1, ('root',), runs, lines, stacks, end, sync=True)
+        if end <= count:
+            self.relex(end, count, bottom + self.margin)
+
+    def visible(self):
+        """
+        The first and last visible lines.
+        """
+
+        top    = self.area.indexref('@0,0')[0]
+        bottom = self.area.indexref('@0,%s' % self.area.winfo_height())[0]
+        return top, bottom
+
+    def guess(self, line0, line1):
+        """
+        Colorize the lines from line0 to line1 as if the lexer
+        was in its initial state.
+        """
+
+        data = self.area.get('%s.0' % line0, '%s.0' % line1)
+        self.paint(line0, get_lines_runs(data, self.lexer, self.tags))
+
+    def update_saved(self):
+        """
+        Colorize the text again when the file was saved. When the lexer
+        didn't change the text is lexed in the thread and only the lines
+        whose tags changed are tagged again.
+
+        It fixes the lines whose tokens depend on text far below them
+        that was edited, see Spider.on_edit.
+        """
+
+        lexer = self.lexer
+        self.set_lexer()
+        self.dump = bool(Spider.TOKENS) and not self.area.view
+
+        if type(lexer) is type(self.lexer) and has_states(self.lexer):
+            self.damage = (1, self.area.lineindex.count())
+            self.update()
+        else:
+            self.tag_all()
+
+        if self.dump and not self.busy:
+            self.store()
 
     def update(self):
         """
-        Update a small range of the text. It is mostly called 
+        Update a small range of the text. It is mostly called
         when Escape is pressed.
+
+        When the lexer state can be recovered only the edited
+        lines are lexed again. Otherwise the visible lines are lexed
+        again when they were edited or scrolled.
         """
 
+        if not self.lexer:
+            return
+
+        if has_states(self.lexer):
+            if self.damage:
+                self.relex(*self.damage)
+            self.damage = None
+            self.live   = None
+            return
+
+        shown = self.visible()
+        if not self.damage and shown == self.shown:
+            return
+
+        self.damage = None
+        self.shown  = shown
+
         TAG_KEYS_PRECEDENCE = PRECEDENCE_TABLE.get(
         tuple(self.lexer.aliases), DEFAULT)
 
         index0 = self.area.index('@0,0')
         index0 = self.area.index('%s -%sl' % (index0, self.max))
-        index0 = self.area.tag_next_occur(TAG_KEYS_PRECEDENCE, 
+        index0 = self.area.tag_next_occur(TAG_KEYS_PRECEDENCE,
         index0, 'insert', '1.0')
 
-        index1 = '@%s,%s' % (self.area.winfo_height(), 
+        index1 = '@%s,%s' % (self.area.winfo_height(),
         self.area.winfo_width())
 
         index2 = self.area.index(index1)
         index2 = self.area.index('%s +%sl' % (index1, self.max))
 
-        index2 = self.area.tag_prev_occur(TAG_KEYS_PRECEDENCE, 
+        index2 = self.area.tag_prev_occur(TAG_KEYS_PRECEDENCE,
         index2, 'insert', 'end')
 
-        for ind in self.styles.keys():
-            self.area.tag_remove(str(ind), index0, index2)
         self.tag_tokens(index0, index2)
 
+    def schedule(self):
+        """
+        <<Data>> happens before the char is inserted.
+        """
+
+        if not self.funcid:
+            self.funcid = self.area.after_idle(self.update_live)
+
+    def update_live(self):
+        """
+        Colorize the lines that were typed since the last call from the 
+        closest known state. It stops when the lexer gets to a state it had 
+        before, after window lines or when it takes longer than budget, 
+        Spider.update does the rest on <<Idle>>.
+
+        The lexer states aren't changed since the text is lexed up to
+        window lines and some regexes look ahead, Spider.update sets them.
+        """
+
+        self.funcid = None
+        if not self.live or not has_states(self.lexer):
+            return
+
+        line0, line1 = self.live
+        self.live    = None
+
+        self.settle()
+        k    = max(bisect_right(self.lines, line0) - 2, 0)
+        line = self.lines[k]
+        old  = dict(zip(self.lines[k + 1:], self.stacks[k + 1:]))
+        data = self.area.get('%s.0' % line, '%s.0' % (line1 + self.window))
+
+        runs, lines, stacks, end = relex(self.lexer, data, line, 
+            self.stacks[k], line1, old, self.step, self.tags, 
+                deadline=time() + self.budget)
+        self.paint(line, runs)
+
+        # When the lexer didn't get to an old state the lines below 
+        # are colorized again until Spider.update runs.
+        k = bisect_left(lines, end)
+        if end <= line1 or k == len(lines) or old.get(end) != stacks[k]:
+            self.live   = (line0, max(line1, end))
+            self.damage = self.join(self.damage, self.live)
+
+    def on_edit(self, index0, index1, pos0, pos1, data):
+        """
+        Shift the lexer states that are after the edited lines and
+        update the damaged range.
+        """
+
+        (line0, col0), (line1, col1) = index0, index1
+        count = data.count('\n')
+        delta = count - (line1 - line0)
+
+        # The range that was being highlighted has to be done again.
+        self.generation = self.generation + 1
+        self.dump       = False
+        if self.pending:
+            self.damage, self.pending = self.join(self.damage, 
+                self.pending), None
+
+        # The states of the edited lines are dropped, the ones after
+        # them are shifted lazily. Tokens that start before line0 may
+        # change too, Spider.relex starts a state earlier. The ones
+        # whose regexes looked ahead further when they failed to
+        # match are fixed when the file is saved.
+        k0 = self.locate(line0)
+        k1 = self.locate(line1)
+        self.move(k0)
+        del self.lines[k0:k1]
+        del self.stacks[k0:k1]
+
+        delta = delta + (self.lag[1] if self.lag else 0)
+        self.lag = (k0, delta) if delta else None
+
+        # The tags of the edited lines aren't known.
+        if line0 <= len(self.runs):
+            self.runs[line0 - 1:line1] = [None] * (count + 1)
+
+        self.damage = self.spread(self.damage, line0, line1, count)
+        self.live   = self.spread(self.live, line0, line1, count)
+
+    def locate(self, line):
+        """
+        The position in lines of the first state after line.
+        """
+
+        if not self.lag:
+            return bisect_right(self.lines, line)
+
+        k, delta = self.lag
+        if k and self.lines[k - 1] > line:
+            return bisect_right(self.lines, line, 0, k)
+        return bisect_right(self.lines, line - delta, k)
+
+    def move(self, k0):
+        """
+        Make the lag start at k0, the lines between the old start
+        and k0 are shifted. Edits that are close to each other
+        shift only a few lines.
+        """
+
+        if not self.lag:
+            return
+
+        k, delta = self.lag
+        if k0 > k:
+            self.lines[k:k0] = [ind + delta for ind in self.lines[k:k0]]
+        else:
+            self.lines[k0:k] = [ind - delta for ind in self.lines[k0:k]]
+        self.lag = (k0, delta)
+
+    def settle(self):
+        """
+        Shift the lines that are off, it is done before they are read.
+        """
+
+        if self.lag:
+            k, delta = self.lag
+            self.lines[k:] = [ind + delta for ind in self.lines[k:]]
+            self.lag = None
+
+    def spread(self, range, line0, line1, count):
+        """
+        Shift the range of lines after the lines from line0 to line1 
+        were replaced by count + 1 lines, the new lines are added to it.
+        """
+
+        start, end = range if range else (line0, line0)
+        end        = end + count - (line1 - line0) \
+            if end > line1 else max(end, line0)
+        return min(start, line0), max(end, line0 + count)
+
+    def join(self, range0, range1):
+        if not range0:
+            return range1
+        return min(range0[0], range1[0]), max(range0[1], range1[1])
+
+    def submit(self, func, args, callback, lines):
+        """
+        Run func(*args) in the lexer thread then callback(result) 
+        if the text didn't change meanwhile. The range of lines is 
+        added to the damage when the text changes before it is tagged.
+        """
+
+        if not Spider.WORKER:
+            Spider.WORKER = Worker()
+
+        generation   = self.generation
+        self.busy    = self.busy + 1
+        self.pending = self.join(self.pending, lines)
+        Spider.WORKER.submit(func, args, 
+            lambda result: self.done(generation, callback, result))
+
+    def done(self, generation, callback, result):
+        # The results for a tab that was closed are dropped.
+        if not self.area.winfo_exists():
+            return
+
+        try:
+            if generation == self.generation and result is not None:
+                callback(result)
+        finally:
+            self.release()
+
+    def relex(self, line0, line1, stop=None):
+        """
+        Lex from the closest known state before line0 until the lexer
+        reaches a line after line1 with the same state it had before.
+        The old states after that line are kept.
+
+        The text is lexed up to the end since some regexes look
+        ahead but the lexer is stopped as soon as the state matches.
+
+        When stop is given the lines until stop are colorized then
+        the lexer goes on from there.
+        """
+
+        # A token that starts before the state that is closest to
+        # line0 may go over it or look ahead into the edited lines.
+        self.settle()
+        k     = max(bisect_right(self.lines, line0) - 2, 0)
+        line  = self.lines[k]
+        stack = self.stacks[k]
+        old   = dict(zip(self.lines[k + 1:], self.stacks[k + 1:]))
+        data  = self.area.get('%s.0' % line, 'end')
+
+        self.submit(relex, (self.lexer, data, line, stack, line1, 
+            old, self.step, self.tags, stop), lambda result: self.done_relex(line, 
+                stack, *result, line1=line1, stop=stop), (line0, line1))
+
+    def done_relex(self, line, stack, runs, lines, stacks, end, 
+        line1=0, stop=None, sync=False):
+        self.settle()
+        k = bisect_left(self.lines, line)
+        self.lines[k:]  = [line] + lines
+        self.stacks[k:] = [stack] + stacks
+
+        if sync:
+            self.paint(line, runs)
+        else:
+            self.retag(line, runs)
+
+        # Go on with the rest of the lines when the lexer 
+        # was stopped before the end.
+        if stop and end >= stop and end <= self.area.lineindex.count():
+            self.relex(end, line1)
+
+    def retag(self, line, runs):
+        """
+        Replace the tags of the lines from line by the ones of runs.
+        It is done in slices from tkinter mainloop.
+        """
+
+        consume_iter(self.apply(self.generation, line, runs))
+
+    def paint(self, line, runs):
+        """
+        Replace the tags of the lines from line by the ones of runs at once.
+        """
+
+        for ind in self.apply(self.generation, line, runs):
+            pass
+
+    def apply(self, generation, line, runs):
+        """
+        Only the lines whose runs changed are tagged again. Each step 
+        takes about budget seconds, it stops when the text changes.
+        """
+
+        self.busy = self.busy + 1
+        start     = time()
+
+        try:
+            for ind in range(0, len(runs), self.chunk):
+                if generation != self.generation: 
+                    return
+
+                self.diff(line + ind, runs[ind:ind + self.chunk])
+                if time() - start > self.budget:
+                    yield
+                    start = time()
+        finally:
+            self.release()
+
+    def diff(self, line, runs):
+        """
+        Tag the lines from line whose runs differ from the ones that 
+        were applied. Tk removes and adds all the ranges of a tag 
+        with one call.
+        """
+
+        removed, added = {}, {}
+        if len(self.runs) < line + len(runs):
+            self.runs.extend([None] * (line + len(runs) - len(self.runs)))
+
+        for ind, new in enumerate(runs, line):
+            old = self.runs[ind - 1]
+            if old == new: 
+                continue
+
+            index0, index1 = '%s.0' % ind, '%s.0' % (ind + 1)
+            names = self.names if old is None else set(
+                run[0] for run in old)
+            for name in names:
+                removed.setdefault(name, []).extend((index0, index1))
+
+            for tag, scol, ecol in new:
+                added.setdefault(tag, []).extend(('%s.%s' % (ind, scol), 
+                    index1 if ecol is None else '%s.%s' % (ind, ecol)))
+            self.runs[ind - 1] = new
+
+        for name, ranges in removed.items():
+            self.area.tag_remove(name, *ranges)
+        for tag, ranges in added.items():
+            self.area.tag_add(tag, *ranges)
+
+    def release(self):
+        """
+        Nothing is pending when no lexing or tagging is going on.
+        """
+
+        self.busy = self.busy - 1
+        if not self.busy:
+            self.pending = None
+            if self.dump:
+                self.store()
+
     def tag_tokens(self, index, stopindex):
         """
-        Add the token'tag to each range of text.
+        Add the token'tag to each range of text. The lines
+        of index and stopindex are lexed entirely.
         """
 
-        count, offset = self.area.indexref(index)
-        tokens        = get_tokens_unprocessed_matrix(count, offset, 
-        self.area.get(index, stopindex), self.lexer)
+        line0 = self.area.indexref(index)[0]
+        line1 = self.area.indexref(stopindex)[0]
+        data  = self.area.get('%s.0' % line0, '%s.0' % (line1 + 1))
 
-        for ((srow, scol), (erow, ecol)), token, value in tokens:
-            self.area.tag_add(str(token), '%s.%s' % (srow, 
-                 scol), '%s.%s' % (erow, ecol))
+        self.submit(get_lines_runs, (data, self.lexer, self.tags), 
+            lambda runs: self.retag(line0, runs), (line0, line1))
 
     def set_token_style(self, token):
         """
         Configure the tag which maps to the token in the
-        AreaVi. 
-        
+        AreaVi.
+
         If there is no such a definition of token
-        in styles dict then it defaults to self.background 
+        in styles dict then it defaults to self.background
         and self.default_style.
         """
 
         tag  = str(token)
         conf = self.theme.style_for_token(token)
 
-        self.area.tag_configure(tag, 
-        foreground='#%s' % conf['color'] if conf['color'] \
-        else self.default_style, 
-        background='#%s' % conf['bgcolor'] if conf['bgcolor'] else \
-        self.default_background, 
-        underline=conf['underline'])
+        foreground = '#%s' % conf['color'] if conf['color'] \
+        else self.default_style
+        background = '#%s' % conf['bgcolor'] if conf['bgcolor'] else \
+        self.default_background
+
+        self.area.tag_configure(tag, foreground=foreground,
+        background=background, underline=conf['underline'])
 
         # Note: It may be interesting to redefine
         # tag_configure in AreaVi and implement it there.
         self.area.tag_lower(tag, 'sel')
 
-install = Spider
-
-
+        # Tags that look like the default style aren't added.
+        if foreground.lower() != self.default_style.lower() \
+            or background.lower() != self.default_background.lower() \
+                or conf['underline']:
+            self.styled.add(tag)
 
+install = Spider
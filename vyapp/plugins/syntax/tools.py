@@ -1,41 +1,222 @@
-def thread_colorize(area, lexer, theme, index, stopindex):
-    for pos, token, value in lexer.get_tokens_unprocessed(area.get(index, stopindex)):
-        area.tag_add(str(token), '%s +%sc' % (index, pos), 
-                     '%s +%sc' % (index, pos + len(value)))
-
-        yield
-
-def matrix_step(map):
-    count, offset = 0, 0
-    for pos, token, value in map:
-        srow   = count 
-        scol   = pos - offset
-        n      = value.count('\n')
-        erow   = srow + n
-        count  = count + n
-        m      = value.rfind('\n') 
-        offset = pos + m + 1 if m >= 0 else offset
-        ecol   = len(value) - (m + 1) if m >= 0 else scol + len(value)
-        yield(((srow, scol), (erow, ecol)), token, value)
+from pygments.token import Error, Whitespace, _TokenType
+from bisect import bisect_left
+from itertools import islice
+from time import time
+import re
 
+NEWLINE = re.compile('\n')
+
+def newlines(data, size=None):
+    """
+    The offsets of the first size newlines of data.
+    """
+
+    return [ind.start() for ind in islice(NEWLINE.finditer(data), size)]
 
 def get_tokens_unprocessed_matrix(count, offset, data, lexer):
-    map = matrix_step(lexer.get_tokens_unprocessed(data))
+    """
+    It yields (((srow, scol), (erow, ecol)), token, value) for the tokens
+    of data that starts at the line count and column offset. The rows are 
+    found by bisecting the offsets of the newlines of data, tokens in the
+    same line as the previous one don't need it.
+    """
 
-    for ((srow, scol), (erow, ecol)), token, value in map:
-        if '\n' in value: 
-            yield(((srow + count, scol + offset), 
-                  (erow + count, ecol)), token, value)
-            break
+    nl = newlines(data)
+    row, start, stop = 0, 0, nl[0] if nl else len(data)
+
+    for pos, token, value in lexer.get_tokens_unprocessed(data):
+        if not start <= pos <= stop:
+            row   = bisect_left(nl, pos)
+            start = nl[row - 1] + 1 if row else 0
+            stop  = nl[row] if row < len(nl) else len(data)
+
+        end = pos + len(value)
+        if end <= stop:
+            erow, ecol = row, end - start
         else:
-            yield(((srow + count, scol + offset), 
-                  (erow + count, ecol + offset)), 
-                   token, value)
+            erow = bisect_left(nl, end, row)
+            ecol = end - nl[erow - 1] - 1
+
+        scol = pos - start
+        yield (((row + count, scol + offset if not row else scol), 
+            (erow + count, ecol + offset if not erow else ecol)), 
+                token, value)
+
+def has_states(lexer):
+    """
+    Whether get_tokens_states can be used with lexer. Lexers that 
+    override get_tokens_unprocessed change the tokens afterwards.
+    """
+
+    # pygments.lexer takes a while to import, it is done once
+    # a lexer exists.
+    from pygments.lexer import RegexLexer
+
+    return isinstance(lexer, RegexLexer) and type(lexer).get_tokens_unprocessed \
+        is RegexLexer.get_tokens_unprocessed
+
+def get_tokens_states(lexer, text, stack=('root',)):
+    """
+    It works like RegexLexer.get_tokens_unprocessed but it also yields
+    (pos, None, stack) when a token starts at the beginning of a line, 
+    the stack is a tuple with the state of the lexer at that position. 
+    Lexing can be resumed from there with:
+
+    get_tokens_states(lexer, text[pos:], stack)
+    """
+
+    pos         = 0
+    tokendefs   = lexer._tokens
+    statestack  = list(stack)
+    statetokens = tokendefs[statestack[-1]]
+
+    while 1:
+        if pos and text[pos - 1] == '\n':
+            yield pos, None, tuple(statestack)
+
+        for rexmatch, action, new_state in statetokens:
+            m = rexmatch(text, pos)
+            if m:
+                if action is not None:
+                    if type(action) is _TokenType:
+                        yield pos, action, m.group()
+                    else:
+                        yield from action(lexer, m)
+                pos = m.end()
+                if new_state is not None:
+                    if isinstance(new_state, tuple):
+                        for state in new_state:
+                            if state == '#pop':
+                                if len(statestack) > 1:
+                                    statestack.pop()
+                            elif state == '#push':
+                                statestack.append(statestack[-1])
+                            else:
+                                statestack.append(state)
+                    elif isinstance(new_state, int):
+                        if abs(new_state) >= len(statestack):
+                            del statestack[1:]
+                        else:
+                            del statestack[new_state:]
+                    elif new_state == '#push':
+                        statestack.append(statestack[-1])
+                    statetokens = tokendefs[statestack[-1]]
+                break
+        else:
+            try:
+                if text[pos] == '\n':
+                    statestack  = ['root']
+                    statetokens = tokendefs['root']
+                    yield pos, Whitespace, '\n'
+                    pos = pos + 1
+                    continue
+                yield pos, Error, text[pos]
+                pos = pos + 1
+            except IndexError:
+                break
+
+def lines_runs(data, tokens, tags, size):
+    """
+    Split the tokens of data, that starts at the beginning of a line,
+    into size lines. It returns a list with a tuple of (tag, scol, ecol) 
+    for each line, ecol is None when the run goes up to the next line.
+    Tokens whose tag isn't in tags are left out.
+
+    The rows are found by bisecting the offsets of the newlines
+    so the tokens that are left out aren't looked at.
+    """
 
-    for ((srow, scol), (erow, ecol)), token, value in map:
-        yield(((srow + count, scol), (erow + count, ecol)), 
-               token, value)
+    lines = [[] for ind in range(size)]
+    nl    = newlines(data, size)
+    names = {}
 
+    # The line of the last token goes from start to the newline at stop.
+    row, start, stop = 0, 0, nl[0] if nl else -1
 
+    for pos, token, value in tokens:
+        tag = names.get(token, False)
+        if tag is False:
+            tag = names[token] = str(token) if str(token) in tags else None
+        if tag is None or not value:
+            continue
+
+        if not start <= pos <= stop:
+            row = bisect_left(nl, pos)
+            if row == size:
+                continue
+            start, stop = nl[row - 1] + 1 if row else 0, nl[row]
+
+        end = pos + len(value)
+        if end <= stop:
+            lines[row].append((tag, pos - start, end - start))
+            continue
+
+        # The token goes over the newlines up to last.
+        last = bisect_left(nl, end, row)
+        lines[row].append((tag, pos - start, None))
+        for ind in range(row + 1, min(last, size)):
+            lines[ind].append((tag, 0, None))
+
+        if last < size and end > nl[last - 1] + 1:
+            lines[last].append((tag, 0, end - nl[last - 1] - 1))
+    return [tuple(ind) for ind in lines]
+
+def get_lines_runs(data, lexer, tags):
+    """
+    The runs of the lines of data as returned by lines_runs.
+    """
+
+    return lines_runs(data, lexer.get_tokens_unprocessed(data), 
+        tags, data.count('\n'))
+
+def relex(lexer, data, line, stack, line1, old, step, tags, stop=None, 
+    deadline=None):
+    """
+    Lex data that starts at line with the lexer state stack until
+    a line after line1 has the same state it has in the dict old,
+    new states are kept every step lines. When stop is given the lexer
+    also stops at the first state after it, the old states are kept
+    so lexing can go on from there. It is the same when the time
+    gets past deadline.
+
+    It returns (runs, lines, stacks, end) where runs are the runs of the
+    lines from line to end as in lines_runs with tags, lines and stacks 
+    are the states after line and end is the line where the lexer stopped.
+    """
+
+    tokens = []
+    lines  = []
+    stacks = []
+    count  = line
+    prev   = 0
+
+    for pos, token, value in get_tokens_states(lexer, data, stack):
+        if token is not None:
+            tokens.append((pos, token, value))
+            continue
+
+        count = count + data.count('\n', prev, pos)
+        prev  = pos
+
+        if count > line1 and old.get(count) == value:
+            break
+
+        halt = stop and count >= stop or deadline and time() > deadline
+        if count - (lines[-1] if lines else line) >= step \
+            or count in old or halt:
+            lines.append(count)
+            stacks.append(value)
+
+        if halt:
+            break
+    else:
+        count = count + data.count('\n', prev)
+        old   = {}
 
+    for ind in sorted(old):
+        if ind >= count and ind not in lines[-1:]:
+            lines.append(ind)
+            stacks.append(old[ind])
 
+    runs = lines_runs(data, tokens, tags, count - line)
+    return runs, lines, stacks, count
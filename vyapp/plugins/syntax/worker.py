@@ -0,0 +1,77 @@
+"""
+This module implements the thread that lexes text for the Spider
+instances. The results are handed back to tkinter mainloop through
+after callbacks, they are scheduled on root so they go on when the
+AreaVi instance that submitted a job is destroyed.
+"""
+
+from threading import Thread, Condition
+from traceback import print_exc as debug
+
+class Worker(Thread):
+    """
+    Jobs are run in the order they were submitted.
+    """
+
+    # Interval in ms to check for finished jobs.
+    timeout = 10
+
+    def __init__(self):
+        Thread.__init__(self, daemon=True)
+        self.cond    = Condition()
+        self.pending = []
+        self.done    = []
+        self.busy    = 0
+        self.funcid  = None
+        self.start()
+
+    def submit(self, func, args, callback):
+        """
+        Call func(*args) in the thread then callback(result)
+        from tkinter mainloop. The result is None when func fails.
+        """
+
+        with self.cond:
+            self.busy = self.busy + 1
+            self.pending.append((func, args, callback))
+            self.cond.notify()
+
+        # The app module creates the editor when it is imported.
+        from vyapp.app import root
+        if not self.funcid:
+            self.funcid = root.after(self.timeout, self.poll)
+
+    def run(self):
+        while True:
+            with self.cond:
+                while not self.pending:
+                    self.cond.wait()
+                func, args, callback = self.pending.pop(0)
+
+            try:
+                result = func(*args)
+            except Exception:
+                debug()
+                result = None
+
+            with self.cond:
+                self.done.append((callback, result))
+
+    def poll(self):
+        """
+        Dispatch the finished jobs while there are jobs going on.
+        """
+
+        with self.cond:
+            done, self.done = self.done, []
+            self.busy = self.busy - len(done)
+
+        for callback, result in done:
+            try:
+                callback(result)
+            except Exception:
+                debug()
+
+        from vyapp.app import root
+        self.funcid = root.after(self.timeout, 
+        self.poll) if self.busy else None
@@ -0,0 +1,73 @@
+"""
+This module implements a python side snapshot of the text of an AreaVi
+instance. It is used to run python regex over the text with a single
+Text.get call then map the character offsets back to Text indexes.
+"""
+
+from itertools import accumulate
+from bisect import bisect_right
+import re
+
+class Snapshot:
+    def __init__(self, data):
+        """
+        The data argument is the text as returned by:
+
+        area.get('1.0', 'end')
+        """
+
+        self.data = data
+
+        # The offset of the first char of each one of the lines,
+        # starts[n - 1] is the offset of the line n. The last entry
+        # corresponds to the 'end' index.
+        lens = map(len, data.split('\n'))
+        self.starts = list(accumulate(map((1).__add__, lens), initial=0))
+
+    def offset(self, index):
+        """
+        Convert a normalized index like '2.3' into a char offset.
+        """
+
+        line, col = index.split('.')
+        line      = min(int(line), len(self.starts) - 1)
+        return self.starts[line - 1] + int(col)
+
+    def index(self, offset):
+        """
+        Convert a char offset into a 'line.col' index.
+        """
+
+        line = bisect_right(self.starts, offset)
+        return '%s.%s' % (line, offset - self.starts[line - 1])
+
+    def compile(self, regex, exact=False, regexp=True,
+        nocase=False, nolinestop=False):
+        """
+        Compile regex with flags that behave like the Text.search
+        options. As in Text.search the '^' and '$' match at line
+        boundaries and '.' doesn't match newlines unless nolinestop is set.
+        """
+
+        if exact or not regexp:
+            regex = re.escape(regex)
+
+        flags = re.MULTILINE
+        if nocase: flags = flags | re.IGNORECASE
+        if nolinestop: flags = flags | re.DOTALL
+        return re.compile(regex, flags)
+
+    def finditer(self, regex, pos, endpos, backwards=False):
+        """
+        It yields (chunk, pos0, pos1) for the matches of a compiled
+        regex between pos and endpos. When backwards is True the
+        matches are yielded from endpos to pos.
+        """
+
+        seq = ((ind.group(), ind.start(), ind.end())
+            for ind in regex.finditer(self.data, pos, endpos))
+
+        if backwards:
+            seq = reversed(list(seq))
+        return seq
+
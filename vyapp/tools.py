@@ -11,17 +11,12 @@ import sys
 
     
 def findline(filename, line, col=0):
-    files    = AreaVi.get_opened_files(root)
     filename = abspath(filename)
+    area     = AreaVi.get_area(filename)
 
-    try:
-        area = files[filename]
-    except KeyError:
+    if not area:
         area = root.note.open(filename)
-    else:
-        pass
-    finally:
-        root.note.set_line(area, line)
+    root.note.set_line(area, line)
 
 def error(handle):
     def shell(*args, **kwargs):
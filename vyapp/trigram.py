@@ -0,0 +1,374 @@
+"""
+This module implements the trigram indexes that narrow the files that
+Sniper and Fstmt search in process.
+
+For each folder there is an index that maps the trigrams of the words
+of its files, lower cased, to the ids of the files that contain them.
+A search looks up the trigrams of the words that any match has to
+contain then only the files that have all of them are searched.
+
+The index is updated from the mtimes of the files before each search,
+only the files that changed are read again. It is kept in a file that
+starts with MAGIC and the size of a json header with the folder and
+the files. A zlib compressed body follows with the trigrams, the
+number of files of each one then the ids of the files.
+"""
+
+from threading import Lock
+from itertools import islice
+from array import array
+from hashlib import sha1
+from vyapp.grep import walk, imap, compile_rule
+from vyapp.base import printd
+import struct
+import json
+import zlib
+import re
+import os
+
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    import sre_parse
+
+MAGIC = b'VYTG\x01'
+SIZE  = struct.Struct('<I')
+
+# It maps the ascii letters, digits and underscore to lower case
+# and the other bytes to spaces.
+WORDS = bytes(ind if chr(ind).isalnum() and ind < 128 or ind == 95
+    else 32 for ind in range(256)).lower()
+
+# The indexes that were loaded by file.
+INDEXES = {}
+
+# The trigrams of the words that were seen, they repeat a lot
+# across the files of a folder.
+CACHE = {}
+
+def word_grams(word):
+    grams = CACHE.get(word)
+    if grams is None:
+        if len(CACHE) > 1000000:
+            CACHE.clear()
+        grams = CACHE[word] = tuple(word[ind:ind + 3] 
+            for ind in range(len(word) - 2))
+    return grams
+
+def get_grams(data):
+    """
+    The trigrams of the words of data, the words are the runs of
+    ascii letters, digits and underscores.
+    """
+
+    grams = set()
+    grams.update(*map(word_grams, set(data.translate(WORDS).split())))
+    return grams
+
+def read_grams(paths):
+    """
+    It returns (path, mtime, size, grams) for the files, the grams are
+    joined in a bytes. Binary files have no grams so they are only
+    searched when the pattern has no trigrams.
+    """
+
+    files = []
+    for path in paths:
+        try:
+            with open(path, 'rb') as fd:
+                st   = os.fstat(fd.fileno())
+                data = fd.read()
+        except OSError:
+            continue
+
+        grams = b'' if b'\0' in data[:8192] else b''.join(get_grams(data))
+        files.append((path, st.st_mtime_ns, st.st_size, grams))
+    return files
+
+def literals(items):
+    """
+    The runs of chars that any match of the parsed pattern contains.
+    """
+
+    runs, run = [], []
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            run.append(chr(av))
+            continue
+        if op is sre_parse.AT:
+            continue
+
+        if run:
+            runs.append(''.join(run))
+        run = []
+
+        if op is sre_parse.SUBPATTERN:
+            runs.extend(literals(av[-1]))
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[0]:
+            runs.extend(literals(av[2]))
+
+    if run:
+        runs.append(''.join(run))
+    return runs
+
+def get_required(pattern, flags, charset):
+    """
+    The trigrams that the files with matches of pattern have.
+    """
+
+    try:
+        runs = literals(sre_parse.parse(pattern, flags))
+    except (re.error, OverflowError, RecursionError):
+        return set()
+
+    grams = set()
+    for ind in runs:
+        try:
+            grams.update(get_grams(ind.encode(charset)))
+        except UnicodeError:
+            continue
+    return grams
+
+class Index:
+    """
+    The trigram index of the files of the folder dir that is
+    kept in the file path.
+    """
+
+    def __init__(self, dir, path):
+        self.dir   = dir
+        self.path  = path
+        self.lock  = Lock()
+
+        # The [path, mtime, size] of each id, None once the file
+        # changed or was removed.
+        self.files = []
+        self.ids   = {}
+        self.grams = {}
+        self.dead  = 0
+        self.changed = False
+
+    def load(self):
+        """
+        Read the index from its file, it returns False when there
+        isn't one for the folder.
+        """
+
+        try:
+            with open(self.path, 'rb') as fd:
+                if fd.read(len(MAGIC)) != MAGIC:
+                    return False
+                size, = SIZE.unpack(fd.read(SIZE.size))
+                head  = json.loads(fd.read(size).decode('utf-8'))
+                body  = zlib.decompress(fd.read())
+        except (OSError, ValueError, struct.error, zlib.error):
+            return False
+
+        if head.get('dir') != self.dir:
+            return False
+
+        count  = head['grams']
+        counts = array('I')
+        ids    = array('I')
+        counts.frombytes(body[3 * count:3 * count + 4 * count])
+        ids.frombytes(body[7 * count:])
+
+        pos = 0
+        for ind in range(count):
+            self.grams[body[3 * ind:3 * ind + 3]] = ids[pos:pos + counts[ind]]
+            pos = pos + counts[ind]
+
+        self.files = head['files']
+        self.ids   = {ind[0]: id for id, ind in enumerate(self.files) if ind}
+        self.dead  = len(self.files) - len(self.ids)
+        return True
+
+    def dump(self):
+        if self.dead > len(self.ids):
+            self.compact()
+
+        keys   = list(self.grams)
+        counts = array('I', (len(self.grams[ind]) for ind in keys))
+        ids    = array('I')
+        for ind in keys:
+            ids.extend(self.grams[ind])
+
+        head = json.dumps({'dir': self.dir, 'grams': len(keys),
+            'files': self.files}).encode('utf-8')
+
+        with open(self.path + '.tmp', 'wb') as fd:
+            fd.write(MAGIC + SIZE.pack(len(head)) + head)
+            fd.write(zlib.compress(b''.join(keys)
+                + counts.tobytes() + ids.tobytes(), 1))
+        os.replace(self.path + '.tmp', self.path)
+        self.changed = False
+
+    def compact(self):
+        """
+        Drop the ids of the files that changed or were removed.
+        """
+
+        table = array('I', [0]) * len(self.files)
+        files = []
+        for id, ind in enumerate(self.files):
+            if ind:
+                table[id] = len(files)
+                files.append(ind)
+
+        alive = self.files
+        for gram, ids in list(self.grams.items()):
+            ids = array('I', (table[ind] for ind in ids if alive[ind]))
+            if ids:
+                self.grams[gram] = ids
+            else:
+                del self.grams[gram]
+
+        self.files = files
+        self.ids   = {ind[0]: id for id, ind in enumerate(files)}
+        self.dead  = 0
+
+    def add(self, path, mtime, size, grams):
+        self.remove(path)
+        id = len(self.files)
+        self.files.append([path, mtime, size])
+        self.ids[path] = id
+
+        postings = self.grams
+        for ind in range(0, len(grams), 3):
+            gram = grams[ind:ind + 3]
+            ids  = postings.get(gram)
+            if ids is None:
+                postings[gram] = array('I', (id,))
+            else:
+                ids.append(id)
+        self.changed = True
+
+    def remove(self, path):
+        id = self.ids.pop(path, None)
+        if id is not None:
+            self.files[id] = None
+            self.dead      = self.dead + 1
+            self.changed   = True
+
+    def update(self, workers=None, stopped=lambda: False, chunk=64):
+        """
+        Read the files that changed since the last update and drop
+        the ones that were removed.
+        """
+
+        paths = set()
+        stale = []
+        for path in walk([self.dir]):
+            paths.add(path)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+
+            id = self.ids.get(path)
+            if id is None or self.files[id][1:] != [st.st_mtime_ns, st.st_size]:
+                stale.append(path)
+
+        for path in [ind for ind in self.ids if ind not in paths]:
+            self.remove(path)
+
+        stale  = iter(stale)
+        chunks = iter(lambda: list(islice(stale, chunk)), [])
+        for files in imap(read_grams, chunks, (), workers, stopped):
+            for ind in files:
+                self.add(*ind)
+
+    def search(self, grams):
+        """
+        The files that have all the grams, all the files when
+        there are none.
+        """
+
+        if not grams:
+            return list(self.ids)
+
+        postings = sorted((self.grams.get(ind, ()) for ind in grams), key=len)
+        ids = set(postings[0])
+        for ind in postings[1:]:
+            ids.intersection_update(ind)
+            if not ids:
+                break
+
+        return [self.files[ind][0] for ind in sorted(ids) if self.files[ind]]
+
+def get_index(home, dir):
+    """
+    The index of the folder dir whose file is in the folder home.
+    """
+
+    path  = os.path.join(home, sha1(dir.encode('utf-8',
+        'surrogatepass')).hexdigest())
+    index = INDEXES.get(path)
+
+    if index is None:
+        index = INDEXES[path] = Index(dir, path)
+        index.load()
+    return index
+
+def keep(dir, paths, ignore, file_regex):
+    """
+    Filter the files of dir like walk does with ignore and file_regex.
+    """
+
+    if not (ignore or file_regex):
+        return paths
+
+    rules = [compile_rule(None, ind) for ind in ignore]
+    regex = re.compile(file_regex) if file_regex else None
+    size  = len(os.path.join(dir, ''))
+    kept  = []
+
+    for path in paths:
+        if regex and not regex.search(path):
+            continue
+        names = path[size:].split(os.sep)
+        if not any(rule.match(name) for base, rule, dironly in rules
+            for name in (names[:-1] if dironly else names)):
+            kept.append(path)
+    return kept
+
+def narrow(home, dirs, pattern, flags, charset, ignore=(), file_regex='',
+    workers=None, stopped=lambda: False):
+    """
+    It yields the files of dirs that may have matches of pattern, the
+    indexes of the folders are updated first.
+    """
+
+    grams   = get_required(pattern, flags, charset)
+    seen    = set()
+    indexes = []
+
+    for dir in dirs:
+        dir = os.path.abspath(dir)
+        if os.path.isfile(dir):
+            yield dir
+            continue
+
+        index = get_index(home, dir)
+        with index.lock:
+            index.update(workers, stopped)
+            paths = index.search(grams)
+        indexes.append(index)
+
+        for path in keep(dir, paths, ignore, file_regex):
+            if path not in seen:
+                seen.add(path)
+                yield path
+
+    # It is written when the files were handed to the search
+    # so the hits don't wait for it.
+    for index in indexes:
+        with index.lock:
+            if index.changed and not stopped():
+                dump(index)
+
+def dump(index):
+    try:
+        index.dump()
+    except OSError as e:
+        printd('Trigram - Failed to save index', index.path, e)
@@ -2,6 +2,7 @@ from tkinter import Listbox, Toplevel,  BOTH, END, TOP, ACTIVE, Text, LEFT, SCRO
 from os.path import relpath
 from vyapp.tools import findline
 from vyapp.areavi import AreaVi
+from vyapp.grep import search
 from vyapp.app import root
 
 class MatchBox(Listbox):
@@ -110,12 +111,19 @@ class OptionWindow(Toplevel):
         self.options = options
 
         self.listbox.delete(0, END)
-        for key, value in options:
-            self.listbox.insert(END, key)
+        self.listbox.insert(END, *(key for key, value in options))
 
         if display:
             self.display()
 
+    def append(self, options):
+        """
+        Add options to the ones that are shown.
+        """
+
+        self.options.extend(options)
+        self.listbox.insert(END, *(key for key, value in options))
+
     def  __init__(self):
         Toplevel.__init__(self, master=root)
         self.options = None
@@ -209,7 +217,8 @@ class LinePicker(OptionWindow):
 
         self.listbox.bind('<Return>', 
         lambda event: self.on_tab())
-        self.area = None
+        self.area   = None
+        self.search = None
 
     def  __call__(self, options=[], display=True):
         """
@@ -218,15 +227,46 @@ class LinePicker(OptionWindow):
         When display=False it just fills the Line 
         Picker for later showing the options with LinePicker.display method.
         """
+        super(LinePicker, self).__call__(self.ranges(options), display)
+
+    def ranges(self, options):
         # Make sure it is a list otherwise it may receive
         # an iterator and display no results even when there are
         # errors.
         options = list(options)
         ranges = zip(('%s - %s:%s' % (msg, relpath(filename), line)
         for filename, line, msg in options), options)
+        return list(ranges)
+
+    def append(self, options):
+        super(LinePicker, self).append(self.ranges(options))
+
+    def grep(self, cmd, charset, pattern):
+        """
+        Run the ag command cmd then show its hits as they are found,
+        the files are searched in process when ag isn't installed.
+        The search that was going on is cancelled.
+        """
+
+        if self.search:
+            self.search.cancel()
+
+        self([], display=False)
+        self.search = search(self, cmd, charset, self.on_hits, 
+        lambda count: self.on_done(pattern, count))
 
-        ranges = list(ranges)
-        super(LinePicker, self).__call__(ranges, display)
+    def on_hits(self, hits):
+        self.append(hits)
+        if len(self.options) == len(hits):
+            self.display()
+        root.status.set_msg('Searching: %s hits' % len(self.options))
+
+    def on_done(self, pattern, count):
+        self.search = None
+        if count:
+            root.status.set_msg('Found %s hits:%s!' % (count, pattern))
+        else:
+            root.status.set_msg('No results:%s!' % pattern)
 
     def on_tab(self):
         index = self.listbox.index(ACTIVE)
@@ -0,0 +1,150 @@
+"""
+This module implements the thread that encodes and writes the text of
+AreaVi instances when they are saved asynchronously. Files are written
+to a temporary file then moved over the destination so a save either
+happens completely or not at all.
+"""
+
+from threading import Thread, Condition
+from traceback import print_exc as debug
+import tempfile
+import atexit
+import os
+
+# The mode of the files that are created, mkstemp creates them
+# readable only by the user.
+UMASK = os.umask(0)
+os.umask(UMASK)
+MODE  = 0o666 & ~UMASK
+
+def write_file(filename, data, fsync=False):
+    """
+    Write data to filename through a temporary file in the same
+    directory that is renamed with os.replace. When fsync is True
+    the data is flushed to the disk before returning.
+    """
+
+    # The file a symlink points to is replaced, not the symlink.
+    filename = os.path.realpath(filename)
+    dir = os.path.dirname(filename)
+    fd, tmp = tempfile.mkstemp(dir=dir,
+    prefix='.%s.' % os.path.basename(filename))
+
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+            file.flush()
+            if fsync:
+                os.fsync(file.fileno())
+
+        # Keep the permissions of the file that is replaced.
+        if os.path.exists(filename):
+            os.chmod(tmp, os.stat(filename).st_mode)
+        else:
+            os.chmod(tmp, MODE)
+        os.replace(tmp, filename)
+    except Exception:
+        os.remove(tmp)
+        raise
+
+    if fsync:
+        fd = os.open(dir, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+class Writer(Thread):
+    """
+    The saves are queued by filename, a save of a file that is
+    queued replaces the queued one so they coalesce.
+    """
+
+    # Interval in ms to check for finished saves.
+    timeout = 30
+
+    def __init__(self):
+        Thread.__init__(self, daemon=True)
+        self.cond    = Condition()
+        self.pending = {}
+        self.done    = []
+        self.busy    = 0
+        self.funcid  = None
+        self.start()
+
+        # The queued saves are written before the process exits.
+        atexit.register(self.wait)
+
+    def save(self, area, filename, data, charset, fsync=False):
+        """
+        Queue data to be encoded and written to filename. The method
+        area.done_save is called from tkinter mainloop when it is done.
+        """
+
+        from vyapp.app import root
+
+        with self.cond:
+            if not filename in self.pending:
+                self.busy = self.busy + 1
+            self.pending[filename] = (area, data, charset, fsync)
+            self.cond.notify_all()
+
+        # The poll is scheduled on root, the area may be
+        # destroyed before the save is done.
+        if not self.funcid:
+            self.funcid = root.after(self.timeout, self.poll)
+
+    def run(self):
+        while True:
+            with self.cond:
+                while not self.pending:
+                    self.cond.wait()
+                filename = next(iter(self.pending))
+                area, data, charset, fsync = self.pending.pop(filename)
+
+            error = None
+            try:
+                write_file(filename, data.encode(charset), fsync)
+            except Exception as excpt:
+                error = excpt
+
+            with self.cond:
+                self.done.append((area, filename, error))
+                self.cond.notify_all()
+
+    def wait(self):
+        """
+        Block until the queued saves are written.
+        """
+
+        with self.cond:
+            while self.busy > len(self.done):
+                self.cond.wait()
+
+    def dispatch(self):
+        """
+        Call area.done_save for the finished saves, it returns
+        their (area, filename, error).
+        """
+
+        with self.cond:
+            done, self.done = self.done, []
+            self.busy = self.busy - len(done)
+
+        for area, filename, error in done:
+            try:
+                area.done_save(filename, error)
+            except Exception:
+                debug()
+        return done
+
+    def poll(self):
+        """
+        Dispatch the finished saves while there are saves going on.
+        """
+
+        from vyapp.app import root
+
+        self.dispatch()
+        self.funcid = root.after(self.timeout, 
+        self.poll) if self.busy else None